@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from conn1 import MySQLDatabase  # Import the Database class
+from categories import compact
 
 # Initialize the database connection
 db = MySQLDatabase()
@@ -68,7 +69,7 @@ fig_bar.update_layout(
 # Display the bar chart
 st.plotly_chart(fig_bar)
 
-st.write(top_distributors_df)
+st.write(compact(top_distributors_df))
 
 
 st.subheader("Cumulative Product Sales for Top 20 Distributors")
@@ -78,7 +79,7 @@ top_20_product_sales_df = db.get_top_20_product_sales()
 
 # Create the treemap
 fig_treemap = px.treemap(
-    top_20_product_sales_df,
+    compact(top_20_product_sales_df),
     path=['item_description'],
     values='total_sales_amt',
     title="Cumulative Product Sales for Top 20 Distributors",
@@ -2,6 +2,9 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from conn import MySQLDatabase  # Import the Database class
+from widgets import search_select
+from categories import compact
+from result_store import stored
 
 # Initialize the database connection
 db = MySQLDatabase()
@@ -13,9 +16,8 @@ st.sidebar.title("Filter Options")
 sales_managers = ["All", "George Omondi", "Joshua Ageta", "Kennedy Mutisya", "Jarso Abdi", "Nicholas Dass", "Nicholas Baraka", "Mourice Kevin Barasa"]
 selected_sales_manager = st.sidebar.selectbox("Select Sales Manager", sales_managers)
 
-products = db.get_all_products()
-products.insert(0, "All")
-selected_product = st.sidebar.selectbox("Select Product", products)
+selected_product = search_select("Select Product", db.get_product_name_index(), key='selected_product',
+                                 extra_options=["All"])
 
 months = ['All', 'Jan', 'Feb', 'March', 'April', 'May', 'June', 'July', 'August', 'September']
 selected_month = st.sidebar.selectbox("Select Month", months)
@@ -32,15 +34,19 @@ else:
 # --- Top 5 Sales Managers and Sales Data ---
 if selected_sales_manager == "All":
     st.subheader(f"Top Sales Managers for {selected_product} in {selected_month}")
-    top_5_sales_managers_df = db.get_top_5_sales_managers(selected_month, selected_product)
+    top_5_sales_managers_df = stored('top_sales_managers',
+                                     lambda: db.get_top_5_sales_managers(selected_month, selected_product),
+                                     selected_month, selected_product)
     top_5_sales_managers_df['total_sales'] = top_5_sales_managers_df['total_sales'].round(0).astype(int)
-    st.write(top_5_sales_managers_df)
+    st.write(compact(top_5_sales_managers_df))
 else:
     # --- Sales Manager's Ranking and Performance ---
     st.subheader(f"{selected_sales_manager}'s Performance in {selected_month}")
     
     # Fetch ranking and calculate percentage above/below the median
-    sales_manager_ranking_df = db.get_sales_manager_ranking(selected_sales_manager, selected_month, selected_product)
+    sales_manager_ranking_df = stored('manager_ranking',
+                                      lambda: db.get_sales_manager_ranking(selected_sales_manager, selected_month, selected_product),
+                                      selected_month, selected_product)
     selected_sales = sales_manager_ranking_df.loc[sales_manager_ranking_df['sales_manager'] == selected_sales_manager, 'total_sales'].values[0]
     
     median_sales = sales_manager_ranking_df['total_sales'].median()
@@ -58,10 +64,13 @@ if selected_sales_manager != "All":
     st.subheader(f"Monthly Sales for {selected_sales_manager} ({selected_product})")
     
     # Fetch monthly sales data for the selected manager and product
-    monthly_sales_df = db.get_monthly_sales_by_manager(selected_sales_manager, selected_product)
+    monthly_sales_df = stored('manager_monthly_sales',
+                              lambda: db.get_monthly_sales_by_manager(selected_sales_manager, selected_product),
+                              selected_sales_manager, selected_product)
     
     # Fetch median sales for all managers
-    median_sales_df = db.get_median_sales_by_month(selected_product)
+    median_sales_df = stored('manager_median_sales', lambda: db.get_median_sales_by_month(selected_product),
+                             selected_product)
 
     # Sort by month order
     monthly_sales_df['month'] = pd.Categorical(monthly_sales_df['month'], categories=month_order, ordered=True)
@@ -93,25 +102,31 @@ if selected_sales_manager != "All":
     
     if selected_product == "All":
         # Fetch cumulative top 5 clients for all products
-        top_5_clients_df = db.get_top_5_clients_by_manager_and_product(selected_sales_manager, selected_month, product=None)
+        top_5_clients_df = stored('manager_top_clients',
+                                  lambda: db.get_top_5_clients_by_manager_and_product(selected_sales_manager, selected_month, product=None),
+                                  selected_sales_manager, selected_month, selected_product)
     else:
         # Fetch top 5 clients for the selected product
-        top_5_clients_df = db.get_top_5_clients_by_manager_and_product(selected_sales_manager, selected_month, product=selected_product)
+        top_5_clients_df = stored('manager_top_clients',
+                                  lambda: db.get_top_5_clients_by_manager_and_product(selected_sales_manager, selected_month, product=selected_product),
+                                  selected_sales_manager, selected_month, selected_product)
     
     if not top_5_clients_df.empty:
         top_5_clients_df['total_sales'] = top_5_clients_df['total_sales'].round(0).astype(int)
-        st.write(top_5_clients_df)
+        st.write(compact(top_5_clients_df))
     else:
         st.write("No data available for the selected filters.")
 
 # --- Cumulative Sales for All Sales Managers ---
 if selected_sales_manager == "All":
     st.subheader(f"Cumulative Sales for All Sales Managers ({selected_product})")
-    cumulative_sales_df = db.get_cumulative_sales_by_manager('All', selected_month, selected_product)
+    cumulative_sales_df = stored('manager_cumulative_sales',
+                                 lambda: db.get_cumulative_sales_by_manager('All', selected_month, selected_product),
+                                 selected_month, selected_product)
     
     # Sort by month order
     cumulative_sales_df['month'] = pd.Categorical(cumulative_sales_df['month'], categories=month_order, ordered=True)
     cumulative_sales_df = cumulative_sales_df.sort_values('month')
     
     cumulative_sales_df['total_sales'] = cumulative_sales_df['total_sales'].round(0).astype(int)
-    st.write(cumulative_sales_df)
+    st.write(compact(cumulative_sales_df))
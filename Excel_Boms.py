@@ -1,5 +1,10 @@
+import time
 import streamlit as st
 import pandas as pd
+from conn1 import MySQLDatabase
+from bom_reader import load_bom
+from bom_engine import get_engine
+from widgets import paginated_table
 
 # Streamlit app to upload and split Excel data
 st.title("BOM Excel Processor")
@@ -8,12 +13,19 @@ st.title("BOM Excel Processor")
 uploaded_file = st.file_uploader("Upload your BOM Excel file", type=["xlsx"])
 
 if uploaded_file is not None:
-    # Step 2: Read the Excel file into a pandas DataFrame
-    df = pd.read_excel(uploaded_file)
+    # Step 2: Stream the workbook into typed columns (cached per file contents across reruns)
+    progress_bar = st.progress(0.0, text="Reading BOM file...")
+    try:
+        file_key, df = load_bom(uploaded_file, progress=lambda f: progress_bar.progress(f, text="Reading BOM file..."))
+    except ValueError as e:
+        progress_bar.empty()
+        st.error(str(e))
+        st.stop()
+    progress_bar.empty()
 
-    # Show the uploaded data
+    # Show the uploaded data one page at a time (the full sheet is too large to send to the browser)
     st.subheader("Uploaded Data")
-    st.write(df)
+    paginated_table(df, key='bom_raw')
 
     # Step 3: Split data into products, bom_components, and bill_of_materials tables
     # Filter rows where the 'Depth' is 1 (Finished Goods) for the products table
@@ -30,14 +42,99 @@ if uploaded_file is not None:
     # Add a column for the finished good (first item in each group with Depth == 1)
     bill_of_materials_df['finished_good_code'] = df['Item'].where(df['Depth'] == 1).ffill()  # Forward fill finished goods
 
+    # Rebuild the real parent of every row from the Depth column (multi-level BOMs)
+    bom_engine = get_engine(file_key, df)
+    parent_rows = bom_engine.parents
+    bill_of_materials_df['parent_code'] = pd.Series(df['Item'].astype(str).to_numpy()[parent_rows],
+                                                    index=df.index).where(parent_rows >= 0)
+
     # Show split DataFrames
     st.subheader("Products Table")
-    st.write(products_df)
+    paginated_table(products_df, key='bom_products')
 
     st.subheader("BOM Components Table")
-    st.write(bom_components_df)
+    paginated_table(bom_components_df, key='bom_components')
 
     st.subheader("Bill of Materials Table")
-    st.write(bill_of_materials_df)
+    paginated_table(bill_of_materials_df, key='bom_lines')
+
+    # Load the split tables into MySQL (batched upserts, one transaction per upload)
+    if st.button("Load BOM into database"):
+        db = MySQLDatabase()
+        db.connect()
+        if db.conn is None:
+            st.error("Could not connect to the database; nothing was loaded.")
+        else:
+            try:
+                started = time.perf_counter()
+                counts = db.bulk_load_bom(products_df, bom_components_df,
+                                          bill_of_materials_df.drop(columns=['parent_code']))
+                elapsed = time.perf_counter() - started
+                st.success(f"Loaded {counts['products']:,} products, {counts['bom_components']:,} components and "
+                           f"{counts['bill_of_materials']:,} BOM lines in {elapsed:.1f}s")
+            except Exception as e:
+                st.error(f"BOM load failed and was rolled back: {e}")
+            finally:
+                db.close()
+
+    # Step 4: Explode finished goods into leaf components and roll up material cost
+    st.subheader("Material Cost Roll-up (per unit of finished good)")
+    cost_df = bom_engine.cost_rollup()
+    paginated_table(cost_df, key='bom_costs', sort_by='material_cost')
+
+    if bom_engine.finished_goods:
+        selected_fg = st.selectbox("Explode a finished good", bom_engine.finished_goods,
+                                   format_func=lambda c: f"{c} — {bom_engine.descriptions.get(c, '')}")
+        explosion_df = pd.DataFrame(
+            [(c, bom_engine.descriptions.get(c), q, bom_engine.unit_price.get(c, 0.0))
+             for c, q in bom_engine.explode(selected_fg).items()],
+            columns=['component_code', 'description', 'quantity', 'unit_price']
+        )
+        explosion_df['cost'] = explosion_df['quantity'] * explosion_df['unit_price']
+        st.dataframe(explosion_df.sort_values('cost', ascending=False), use_container_width=True)
+
+    # Step 5: Where-used lookup (which parents / finished goods consume a component)
+    st.subheader("Where-used Lookup")
+    where_used = bom_engine.where_used_index()
+    component_search = st.text_input("Component code or description contains", "")
+    needle = component_search.strip().lower()
+    component_codes = sorted(
+        c for c in where_used
+        if not needle or needle in c.lower() or needle in bom_engine.descriptions.get(c, '').lower()
+    )
+    if component_codes:
+        selected_component = st.selectbox("Component", component_codes,
+                                          format_func=lambda c: f"{c} — {bom_engine.descriptions.get(c, '')}")
+        used_df = bom_engine.where_used(selected_component)
+        n_fgs = (used_df['relation'] == 'Finished good').sum()
+        st.caption(f"Used in **{n_fgs}** finished good(s); quantity is per unit of the parent / finished good.")
+        st.dataframe(used_df, use_container_width=True)
+    else:
+        st.info("No component matches the search.")
 
+    # Step 6: Material demand implied by sales volumes (sales_per_client x BOM explosion)
+    st.subheader("Material Demand from Sales")
+    if st.button("Compute material demand from sales"):
+        db = MySQLDatabase()
+        db.connect()
+        try:
+            st.session_state['bom_sales_volumes'] = db.get_monthly_product_quantities()
+        finally:
+            db.close()
 
+    if 'bom_sales_volumes' in st.session_state:
+        month_order = ['Jan', 'Feb', 'March', 'April', 'May', 'June',
+                       'July', 'August', 'September', 'October', 'November', 'December']
+        demand_df, unmatched = bom_engine.material_demand(st.session_state['bom_sales_volumes'])
+        if demand_df.empty:
+            st.info("No sold products could be matched to finished goods in this BOM.")
+        else:
+            months_available = [m for m in month_order if m in set(demand_df['month'])]
+            demand_month = st.selectbox("Month", ['All'] + months_available)
+            view = demand_df if demand_month == 'All' else demand_df[demand_df['month'] == demand_month]
+            view = (view.groupby(['component_code', 'description'], as_index=False)[['quantity', 'material_cost']]
+                    .sum().sort_values('material_cost', ascending=False))
+            st.metric("Material cost", f"Ksh{view['material_cost'].sum():,.0f}")
+            paginated_table(view, key='bom_demand', sort_by='material_cost')
+        if unmatched:
+            st.caption(f"{len(unmatched)} sold product(s) have no BOM in this file and were skipped.")
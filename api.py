@@ -0,0 +1,289 @@
+"""
+JSON API over MySQLDatabase for tools outside Streamlit.
+
+Exposes a fixed set of the get_* queries as
+
+    GET /api/<endpoint>?param=value...     -> {"endpoint", "params", "data"}
+    GET /api                               -> endpoint list with parameters
+
+Parameters are validated before any query runs (known clients / products,
+month labels, client types, numeric ranges). Requests are served
+concurrently on threads that borrow connections from the connection pool
+of the endpoint's database (conn1, or conn for the Sales Managers data),
+and serialized responses are kept in a TTL cache so repeated calls from
+different teams do not reach MySQL again.
+
+    python api.py --port 8502
+"""
+import argparse
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import conn1
+from conn import MySQLDatabase as SalesDatabase
+from conn1 import MySQLDatabase
+
+
+MONTHS = ['All', 'Jan', 'Feb', 'March', 'April', 'May', 'June', 'July', 'August', 'September']
+CLIENT_TYPES = ['All', 'DISTRIBUTORS', 'SPECIAL DISTRIBUTOR', 'MINIMART', 'KABL OFFICE', 'M/BIKE', 'SUPERMARKET',
+                'KABL STAFF', 'SCHOOLS', 'LOCAL CUSTOMERS', 'CORPORATES']
+SALES_MANAGERS = ["George Omondi", "Joshua Ageta", "Kennedy Mutisya", "Jarso Abdi", "Nicholas Dass",
+                  "Nicholas Baraka", "Mourice Kevin Barasa"]
+
+CACHE_TTL = 300  # seconds
+_MAX_RESPONSES = 1024
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# -------------------------
+# Parameter validation
+# -------------------------
+def _client(db, value):
+    if value not in db.get_client_name_index().codes:
+        raise ValueError(f"unknown client {value!r}")
+    return value
+
+def _product(db, value, allow_all=False):
+    if allow_all and value == 'All':
+        return value
+    if value not in db.get_product_name_index().codes:
+        raise ValueError(f"unknown product {value!r}")
+    return value
+
+def _choice(options):
+    def check(db, value):
+        if value not in options:
+            raise ValueError(f"must be one of {', '.join(options)}")
+        return value
+    return check
+
+def _int_range(low, high):
+    def check(db, value):
+        try:
+            number = int(value)
+        except ValueError:
+            raise ValueError("must be an integer")
+        if not low <= number <= high:
+            raise ValueError(f"must be between {low} and {high}")
+        return number
+    return check
+
+def _text(db, value):
+    return value
+
+
+# name -> (validator, default); a default of None makes the parameter required
+PARAMS = {
+    'client': (_client, None),
+    'product': (_product, None),
+    'product_or_all': (lambda db, v: _product(db, v, allow_all=True), 'All'),
+    'month': (_choice(MONTHS), 'All'),
+    'client_type': (_choice(CLIENT_TYPES), 'All'),
+    'percentage': (_int_range(0, 100), 10),
+    'limit': (_int_range(1, 1000), 50),
+    'manager': (_choice(SALES_MANAGERS), None),
+    'q': (_text, ''),
+}
+
+# endpoint -> (method, [parameter names in call order], database class). The Sales Managers
+# endpoints read the same database as the Sales Managers page (conn.py); the rest read conn1's.
+ENDPOINTS = {
+    'overall_sales_per_month': ('get_overall_sales_per_month', [], MySQLDatabase),
+    'top_customers': ('get_top_customers', [], MySQLDatabase),
+    'top_routes': ('get_top_routes', [], MySQLDatabase),
+    'top_items': ('get_top_items', [], MySQLDatabase),
+    'top_distributors': ('get_top_20_distributors', [], MySQLDatabase),
+    'total_sales': ('get_total_overall_sales', [], MySQLDatabase),
+    'clients': ('search_clients', ['q', 'limit'], MySQLDatabase),
+    'products': ('search_products', ['q', 'limit'], MySQLDatabase),
+    'client_sales': ('get_client_sales', ['client'], MySQLDatabase),
+    'client_product_sales': ('get_client_product_sales', ['client', 'month'], MySQLDatabase),
+    'client_product_sales_detailed': ('get_client_product_sales_detailed', ['client'], MySQLDatabase),
+    'product_top_clients': ('get_top_clients_for_product', ['product', 'month', 'limit'], MySQLDatabase),
+    'product_route_distribution': ('get_sales_distribution_by_route', ['product', 'month'], MySQLDatabase),
+    'product_monthly_series': ('get_product_monthly_series', ['product'], MySQLDatabase),
+    'product_concentration': ('get_product_concentration_stats', ['product', 'month'], MySQLDatabase),
+    'product_risk_ranking': ('get_product_risk_ranking', ['month'], MySQLDatabase),
+    'top_clients': ('get_top_clients', ['client_type', 'percentage'], MySQLDatabase),
+    'client_type_total': ('get_total_sales_by_client_type', ['client_type'], MySQLDatabase),
+    'client_segment': ('get_client_segment', ['client_type', 'percentage'], MySQLDatabase),
+    'manager_ranking': ('get_sales_manager_ranking', ['manager', 'month', 'product_or_all'], SalesDatabase),
+    'manager_monthly_sales': ('get_monthly_sales_by_manager', ['manager', 'product_or_all'], SalesDatabase),
+}
+
+
+def parse_params(db, endpoint, query):
+    """Validated positional arguments for `endpoint` from a parsed query string."""
+    _, names, _ = ENDPOINTS[endpoint]
+    unknown = set(query) - set(names)
+    if unknown:
+        raise ApiError(400, f"unknown parameter(s): {', '.join(sorted(unknown))}")
+    args = []
+    for name in names:
+        validator, default = PARAMS[name]
+        values = query.get(name)
+        if not values:
+            if default is None:
+                raise ApiError(400, f"missing required parameter '{name}'")
+            args.append(default)
+            continue
+        try:
+            args.append(validator(db, values[-1]))
+        except ValueError as e:
+            raise ApiError(400, f"invalid '{name}': {e}")
+    return args
+
+
+# -------------------------
+# Serialization & response cache
+# -------------------------
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return json.loads(value.to_json(orient='records' if isinstance(value, pd.DataFrame) else 'index'))
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return str(value)
+
+def to_json(value):
+    if isinstance(value, pd.DataFrame):
+        return value.to_json(orient='records', date_format='iso', default_handler=str)
+    return json.dumps(value, default=_json_default)
+
+
+_responses = OrderedDict()  # (endpoint, args) -> (expires_at, body bytes)
+_responses_lock = threading.Lock()
+
+# At most one database call per pooled connection at a time
+_db_slots = threading.BoundedSemaphore(conn1.POOL_SIZE)
+_indexes_lock = threading.Lock()
+
+
+def _pooled_db(database=MySQLDatabase):
+    db = database()
+    db.connect(pooled=True)
+    if db.conn is None:
+        raise ApiError(503, "database unavailable")
+    return db
+
+
+def _load_name_indexes(database=MySQLDatabase):
+    """
+    Client/product name indexes of `database` used for validation
+    (rebuilt with the other precomputed aggregates).
+    """
+    probe = database()
+    with _indexes_lock:
+        if probe.is_cached('client_name_index') and probe.is_cached('product_name_index'):
+            return
+        with _db_slots:
+            db = _pooled_db(database)
+            try:
+                db.get_client_name_index()
+                db.get_product_name_index()
+            finally:
+                db.close()
+
+
+def call_endpoint(endpoint, query, ttl=CACHE_TTL):
+    """JSON response body (bytes) for `endpoint`; raises ApiError for client errors."""
+    if endpoint not in ENDPOINTS:
+        raise ApiError(404, f"unknown endpoint '{endpoint}'")
+    method, names, database = ENDPOINTS[endpoint]
+
+    # Validation only needs the in-memory name indexes, so cache hits never touch MySQL
+    _load_name_indexes(database)
+    args = parse_params(database(), endpoint, query)
+    key = (endpoint, tuple(args))
+    with _responses_lock:
+        cached = _responses.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            _responses.move_to_end(key)
+            return cached[1]
+
+    with _db_slots:
+        db = _pooled_db(database)
+        try:
+            data = getattr(db, method)(*args)
+        finally:
+            db.close()
+
+    params = json.dumps(dict(zip(names, args)), default=_json_default)
+    body = f'{{"endpoint": {json.dumps(endpoint)}, "params": {params}, "data": {to_json(data)}}}'.encode()
+    with _responses_lock:
+        _responses[key] = (time.monotonic() + ttl, body)
+        while len(_responses) > _MAX_RESPONSES:
+            _responses.popitem(last=False)
+    return body
+
+
+def clear_response_cache():
+    with _responses_lock:
+        _responses.clear()
+
+
+# -------------------------
+# HTTP server
+# -------------------------
+class ApiHandler(BaseHTTPRequestHandler):
+    ttl = CACHE_TTL
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split('/') if p]
+        try:
+            if parts in ([], ['api']):
+                listing = {name: names for name, (_, names, _) in ENDPOINTS.items()}
+                self._send(200, json.dumps({'endpoints': listing}).encode())
+            elif len(parts) == 2 and parts[0] == 'api':
+                self._send(200, call_endpoint(parts[1], parse_qs(url.query), ttl=self.ttl))
+            else:
+                raise ApiError(404, "not found")
+        except ApiError as e:
+            self._send(e.status, json.dumps({'error': str(e)}).encode())
+        except Exception as e:
+            self.log_error("%s failed: %s", self.path, e)
+            self._send(500, json.dumps({'error': 'internal error'}).encode())
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kenafric sales JSON API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--ttl', type=int, default=CACHE_TTL, help="response cache lifetime in seconds")
+    args = parser.parse_args(argv)
+
+    ApiHandler.ttl = args.ttl
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    server.daemon_threads = True
+    print(f"Serving API on http://{args.host}:{args.port}/api")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Multi-level BOM explosion and material cost roll-up.
+
+The BOM export is a flat, depth-ordered listing: every row's parent is the
+closest preceding row with a smaller Depth. BOMEngine rebuilds that tree,
+then explodes each finished good (Depth == 1) into the leaf components it
+needs per unit, multiplying quantities down the levels. Explosions are
+memoized per item code, so a sub-assembly shared by many finished goods is
+only expanded once.
+"""
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def reconstruct_parents(depths) -> np.ndarray:
+    """Row index of each row's parent (-1 for top-level rows), from the Depth column."""
+    parents = np.full(len(depths), -1, dtype=np.int64)
+    stack = []  # (depth, row) of the current ancestor chain
+    for row, depth in enumerate(depths):
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        if stack:
+            parents[row] = stack[-1][1]
+        stack.append((depth, row))
+    return parents
+
+
+class BOMEngine():
+    def __init__(self, bom_df: pd.DataFrame):
+        """bom_df: parsed BOM with at least Item, Item Description, Quantity, Price and Depth."""
+        items = bom_df['Item'].astype(str).to_numpy()
+        depths = bom_df['Depth'].to_numpy()
+        quantities = bom_df['Quantity'].fillna(0).to_numpy(dtype=np.float64)
+        prices = bom_df['Price'].fillna(0).to_numpy(dtype=np.float64)
+
+        self.parents = reconstruct_parents(depths)
+        self.descriptions = dict(zip(items, bom_df['Item Description'].astype(str)))
+        self.finished_goods = list(OrderedDict.fromkeys(items[depths == 1]))
+
+        # Children of each parent row; a shared sub-assembly is listed under every finished
+        # good that uses it, so each code keeps the structure of its first listing only.
+        children_by_row = {}
+        for row, parent in enumerate(self.parents):
+            if parent >= 0:
+                children_by_row.setdefault(parent, []).append((items[row], quantities[row]))
+        self.children = {}
+        for row, kids in children_by_row.items():
+            self.children.setdefault(items[row], kids)
+
+        # Unit price per item (last non-zero price seen in the export)
+        self.unit_price = {}
+        for code, price in zip(items, prices):
+            if price or code not in self.unit_price:
+                self.unit_price[code] = price
+
+        self._explosions = {}
+        self._requirements = {}
+        self._costs = {}
+        self._where_used = None
+
+    def explode(self, code, _path=()):
+        """Leaf components needed for one unit of `code`, as {component_code: quantity}."""
+        if code in self._explosions:
+            return self._explosions[code]
+        if code in _path:
+            raise ValueError(f"Cycle in BOM: {' -> '.join(_path + (code,))}")
+
+        kids = self.children.get(code)
+        if not kids:
+            result = {code: 1.0}
+        else:
+            result = {}
+            for child, qty in kids:
+                for leaf, leaf_qty in self.explode(child, _path + (code,)).items():
+                    result[leaf] = result.get(leaf, 0.0) + qty * leaf_qty
+        self._explosions[code] = result
+        return result
+
+    def requirements(self, code, _path=()):
+        """Every component below `code` (sub-assemblies and leaves) with quantity per unit."""
+        if code in self._requirements:
+            return self._requirements[code]
+        if code in _path:
+            raise ValueError(f"Cycle in BOM: {' -> '.join(_path + (code,))}")
+
+        result = {}
+        for child, qty in self.children.get(code, ()):
+            result[child] = result.get(child, 0.0) + qty
+            for desc, desc_qty in self.requirements(child, _path + (code,)).items():
+                result[desc] = result.get(desc, 0.0) + qty * desc_qty
+        self._requirements[code] = result
+        return result
+
+    def where_used_index(self):
+        """
+        Reverse index built once per BOM:
+        component_code -> {'parents': {parent_code: qty}, 'finished_goods': {fg_code: qty per fg unit}}
+        """
+        if self._where_used is None:
+            index = {}
+            for parent, kids in self.children.items():
+                for child, qty in kids:
+                    entry = index.setdefault(child, {'parents': {}, 'finished_goods': {}})
+                    entry['parents'][parent] = entry['parents'].get(parent, 0.0) + qty
+            for fg in self.finished_goods:
+                for component, qty in self.requirements(fg).items():
+                    entry = index.setdefault(component, {'parents': {}, 'finished_goods': {}})
+                    entry['finished_goods'][fg] = qty
+            self._where_used = index
+        return self._where_used
+
+    def where_used(self, code):
+        """
+        Finished goods and direct parents that use `code`.
+        Returns a DataFrame with columns ['relation', 'item_code', 'description', 'quantity'].
+        """
+        entry = self.where_used_index().get(str(code), {'parents': {}, 'finished_goods': {}})
+        rows = [('Finished good', fg, self.descriptions.get(fg), qty) for fg, qty in entry['finished_goods'].items()]
+        rows += [('Direct parent', p, self.descriptions.get(p), qty) for p, qty in entry['parents'].items()]
+        return pd.DataFrame(rows, columns=['relation', 'item_code', 'description', 'quantity'])
+
+    def rolled_cost(self, code):
+        """Material cost of one unit of `code`, rolled up from its leaf component prices."""
+        if code not in self._costs:
+            self._costs[code] = sum(qty * self.unit_price.get(leaf, 0.0)
+                                    for leaf, qty in self.explode(code).items())
+        return self._costs[code]
+
+    def explode_all(self) -> pd.DataFrame:
+        """Long table of leaf requirements per unit of every finished good."""
+        records = [
+            (fg, component, qty)
+            for fg in self.finished_goods
+            for component, qty in self.explode(fg).items()
+        ]
+        return pd.DataFrame(records, columns=['finished_good_code', 'component_code', 'quantity'])
+
+    def material_demand(self, sales_df: pd.DataFrame, product_col='item_description',
+                        qty_col='total_quantity_sold', period_col='month'):
+        """
+        Component consumption and material cost implied by product volumes.
+
+        sales_df has one row per (period, product) with a quantity; products are matched
+        to finished goods by item code, or by description when product_col holds descriptions.
+        Computed as (period x product) @ (product x component) with the BOM explosion kept
+        in sparse (coordinate) form. Returns (demand_df, unmatched_products) where demand_df
+        has columns [period_col, 'component_code', 'description', 'quantity', 'material_cost'].
+        """
+        columns = [period_col, 'component_code', 'description', 'quantity', 'material_cost']
+        explosion = self.explode_all()
+        if sales_df.empty or explosion.empty:
+            return pd.DataFrame(columns=columns), []
+
+        # Sales product label -> finished good code (codes win over descriptions)
+        fg_lookup = {self.descriptions.get(fg): fg for fg in self.finished_goods}
+        fg_lookup.update({fg: fg for fg in self.finished_goods})
+        sales = sales_df[[period_col, product_col, qty_col]].copy()
+        sales['fg'] = sales[product_col].astype(str).map(fg_lookup)
+        unmatched = sorted(sales.loc[sales['fg'].isna(), product_col].astype(str).unique())
+        sales = sales.dropna(subset=['fg'])
+        if sales.empty:
+            return pd.DataFrame(columns=columns), unmatched
+
+        # Dense period x product volume matrix (small: months x sold finished goods)
+        volumes = sales.pivot_table(index=period_col, columns='fg', values=qty_col,
+                                    aggfunc='sum', fill_value=0, observed=True)
+        periods = list(volumes.index)
+        product_pos = {fg: i for i, fg in enumerate(volumes.columns)}
+
+        # Sparse product x component matrix in coordinate form, limited to sold products
+        explosion = explosion[explosion['finished_good_code'].isin(product_pos)]
+        component_codes, comp_idx = np.unique(explosion['component_code'].to_numpy(), return_inverse=True)
+        prod_idx = explosion['finished_good_code'].map(product_pos).to_numpy()
+        per_unit = explosion['quantity'].to_numpy(dtype=np.float64)
+
+        vol = volumes.to_numpy(dtype=np.float64)
+        demand = np.zeros((len(periods), len(component_codes)))
+        np.add.at(demand.T, comp_idx, (vol[:, prod_idx] * per_unit).T)
+
+        demand_df = pd.DataFrame(demand, index=periods, columns=component_codes)
+        demand_df.index.name = period_col
+        demand_df = demand_df.stack().rename('quantity').reset_index()
+        demand_df.columns = [period_col, 'component_code', 'quantity']
+        demand_df = demand_df[demand_df['quantity'] != 0]
+        prices = demand_df['component_code'].map(self.unit_price).fillna(0.0)
+        demand_df['material_cost'] = demand_df['quantity'] * prices
+        demand_df['description'] = demand_df['component_code'].map(self.descriptions)
+        return demand_df[columns].reset_index(drop=True), unmatched
+
+    def cost_rollup(self) -> pd.DataFrame:
+        """Rolled-up material cost per unit of every finished good."""
+        rows = [{
+            'finished_good_code': fg,
+            'description': self.descriptions.get(fg),
+            'n_components': len(self.explode(fg)),
+            'material_cost': self.rolled_cost(fg),
+        } for fg in self.finished_goods]
+        return pd.DataFrame(rows, columns=['finished_good_code', 'description', 'n_components', 'material_cost'])
+
+
+# file hash -> BOMEngine, so reruns on the same upload reuse the memoized explosions
+_engine_cache = OrderedDict()
+_CACHE_SIZE = 4
+
+
+def get_engine(file_key, bom_df):
+    if file_key not in _engine_cache:
+        _engine_cache[file_key] = BOMEngine(bom_df)
+        while len(_engine_cache) > _CACHE_SIZE:
+            _engine_cache.popitem(last=False)
+    _engine_cache.move_to_end(file_key)
+    return _engine_cache[file_key]
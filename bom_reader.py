@@ -0,0 +1,143 @@
+"""
+Streaming reader for BOM Excel exports.
+
+The workbook is read row by row in openpyxl's read-only mode, in chunks, and
+only the columns the BOM pages use are kept, stored as typed arrays
+(float for Quantity/Price, small ints for Depth, categoricals for text).
+Parsed results are cached by the SHA-1 of the file bytes, so widget reruns
+on the same upload do not parse the workbook again.
+
+Depth drives the BOM tree (see bom_engine), so a row whose Depth is blank or
+not a whole number is an error, reported with its sheet and row number,
+rather than being read as a new top-level item.
+"""
+import hashlib
+import io
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+
+BOM_COLUMNS = ['Item', 'Item Description', 'UoM', 'Quantity', 'Whse', 'Price', 'Depth', 'BOM Type']
+NUMERIC_COLUMNS = {'Quantity': np.float64, 'Price': np.float64, 'Depth': np.int16}
+
+# file hash -> parsed DataFrame (small LRU; one entry per recently uploaded workbook)
+_parsed_cache = OrderedDict()
+_CACHE_SIZE = 4
+_MAX_REPORTED_ROWS = 20
+
+
+def file_hash(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def _to_numeric(values, dtype):
+    arr = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+    if np.issubdtype(dtype, np.integer):
+        return np.nan_to_num(arr, nan=0).astype(dtype)
+    return arr.astype(dtype)
+
+
+def _invalid_depths(values):
+    """Mask of Depth values that are blank, non-numeric or not whole numbers."""
+    arr = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+    return np.isnan(arr) | (np.nan_to_num(arr) % 1 != 0)
+
+
+def _to_text(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def read_bom_excel(source, chunk_size=5000, progress=None):
+    """
+    Parse a BOM workbook (path or file-like) into a DataFrame with BOM_COLUMNS.
+    progress: optional callable taking a float in [0, 1].
+    """
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        total_rows = max((ws.max_row or 0) - 1, 1)
+        rows = ws.iter_rows(values_only=True)
+
+        header = [str(h).strip() if h is not None else '' for h in next(rows, ())]
+        missing = [c for c in BOM_COLUMNS if c not in header]
+        if missing:
+            raise ValueError(f"BOM file is missing columns: {', '.join(missing)}")
+        positions = [header.index(c) for c in BOM_COLUMNS]
+
+        chunks = {c: [] for c in BOM_COLUMNS}
+        buffer = []
+        row_numbers = []  # worksheet row of each buffered row
+        bad_depth_rows = []
+        done = 0
+
+        def flush():
+            cols = list(zip(*buffer))
+            for name, values in zip(BOM_COLUMNS, cols):
+                if name == 'Depth':
+                    bad_depth_rows.extend(np.asarray(row_numbers)[_invalid_depths(values)].tolist())
+                if name in NUMERIC_COLUMNS:
+                    chunks[name].append(_to_numeric(values, NUMERIC_COLUMNS[name]))
+                else:
+                    chunks[name].append(np.array(values, dtype=object))
+            buffer.clear()
+            row_numbers.clear()
+
+        for row_number, row in enumerate(rows, start=2):
+            if row is None or all(v is None for v in row):
+                continue
+            buffer.append(tuple(row[i] if i < len(row) else None for i in positions))
+            row_numbers.append(row_number)
+            if len(buffer) >= chunk_size:
+                done += len(buffer)
+                flush()
+                if progress:
+                    progress(min(done / total_rows, 1.0))
+        if buffer:
+            done += len(buffer)
+            flush()
+        sheet = ws.title
+    finally:
+        wb.close()
+
+    if bad_depth_rows:
+        shown = ', '.join(str(r) for r in bad_depth_rows[:_MAX_REPORTED_ROWS])
+        more = len(bad_depth_rows) - _MAX_REPORTED_ROWS
+        raise ValueError(f"BOM file has a blank or non-numeric Depth on sheet '{sheet}', "
+                         f"row(s) {shown}{f' and {more} more' if more > 0 else ''}")
+
+    data = {}
+    for name in BOM_COLUMNS:
+        parts = chunks[name]
+        if name in NUMERIC_COLUMNS:
+            data[name] = np.concatenate(parts) if parts else np.array([], dtype=NUMERIC_COLUMNS[name])
+        else:
+            values = np.concatenate(parts) if parts else np.array([], dtype=object)
+            # Item codes and descriptions repeat across finished goods; categoricals store each once
+            data[name] = pd.Categorical([_to_text(v) for v in values])
+    if progress:
+        progress(1.0)
+    return pd.DataFrame(data)
+
+
+def load_bom(uploaded_file, progress=None):
+    """Parse an uploaded BOM workbook, reusing the cached result for identical file contents."""
+    raw = uploaded_file.getvalue()
+    key = file_hash(raw)
+    if key in _parsed_cache:
+        _parsed_cache.move_to_end(key)
+        if progress:
+            progress(1.0)
+        return key, _parsed_cache[key]
+
+    df = read_bom_excel(io.BytesIO(raw), progress=progress)
+    _parsed_cache[key] = df
+    while len(_parsed_cache) > _CACHE_SIZE:
+        _parsed_cache.popitem(last=False)
+    return key, df
@@ -0,0 +1,77 @@
+"""
+Shared dictionaries for the label columns of query results.
+
+Customer names, product descriptions, routes, months, sales managers and
+client types are repeated on thousands of rows. MySQLDatabase returns these
+columns as pandas categoricals backed by one process-wide dictionary per
+kind of label: each distinct label is stored once, rows hold integer codes,
+and equality filters and groupbys compare codes instead of strings.
+
+Dictionaries only grow. A label keeps its code for the life of the process,
+so frames from different queries (and page reruns) share codes. A frame's
+categories may therefore include labels it does not contain. Group with
+observed=True, and call compact() before handing a frame to code that
+enumerates every category (Plotly hierarchy charts, pivot tables).
+"""
+import threading
+
+import pandas as pd
+
+
+# result column -> dictionary it is encoded with
+COLUMN_DICTIONARIES = {
+    'customer_name': 'client',
+    'client_name': 'client',
+    'distributor_name': 'client',
+    'bp_name': 'client',
+    'item_description': 'product',
+    'route': 'route',
+    'month': 'month',
+    'sales_manager': 'sales_manager',
+    'group_code': 'client_type',
+}
+
+_labels = {}  # dictionary -> {label: code}
+_dtypes = {}  # dictionary -> CategoricalDtype over every label seen so far
+_lock = threading.Lock()
+
+
+def _dtype_for(dictionary, values):
+    new = [v for v in pd.unique(values) if pd.notna(v)]
+    with _lock:
+        labels = _labels.setdefault(dictionary, {})
+        new = [v for v in new if v not in labels]
+        if new or dictionary not in _dtypes:
+            for v in new:
+                labels[v] = len(labels)
+            _dtypes[dictionary] = pd.CategoricalDtype(list(labels), ordered=False)
+        return _dtypes[dictionary]
+
+
+def encode(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert the known label columns of `df` (in place) to categoricals over the shared dictionaries."""
+    for column, dictionary in COLUMN_DICTIONARIES.items():
+        if column in df.columns and df[column].dtype == object:
+            df[column] = df[column].astype(_dtype_for(dictionary, df[column].to_numpy()))
+    return df
+
+
+def shared_columns(df: pd.DataFrame) -> list:
+    """Columns of `df` encoded over a shared dictionary (known label columns holding unordered categoricals)."""
+    return [c for c in df.columns if c in COLUMN_DICTIONARIES
+            and isinstance(df[c].dtype, pd.CategoricalDtype) and not df[c].dtype.ordered]
+
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of `df` whose categorical columns list only the labels present in it."""
+    df = df.copy()
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].cat.remove_unused_categories()
+    return df
+
+
+def dictionary_sizes():
+    """{dictionary: number of labels} for this process."""
+    with _lock:
+        return {name: len(labels) for name, labels in _labels.items()}
@@ -0,0 +1,68 @@
+"""
+Compact trace building for many-series line charts.
+
+Series are split in one groupby pass instead of filtering the frame once per
+series, the long tail beyond `max_series` is collapsed into a single "Other"
+series, and WebGL traces (Scattergl) are used once the chart is large enough
+that SVG rendering becomes slow in the browser. Hover text is a template per
+trace rather than one pre-formatted string per point, which keeps the
+payload small.
+"""
+import pandas as pd
+import plotly.graph_objects as go
+
+
+MAX_SERIES = 15
+WEBGL_SERIES_THRESHOLD = 30
+WEBGL_POINT_THRESHOLD = 2000
+OTHER_LABEL = 'Other'
+
+
+def _plain(values):
+    """Categoricals (e.g. ordered months) as plain labels so Plotly serializes them compactly."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.astype(str).to_numpy()
+    return values.to_numpy()
+
+
+def split_series(df: pd.DataFrame, group_col: str, x: str, y: str, max_series=MAX_SERIES, rank_by=None):
+    """
+    [(name, x_values, y_values)] ordered by importance; groups beyond max_series are
+    summed per x into one OTHER_LABEL series. Importance is the sum of |rank_by| (default |y|).
+    """
+    if df.empty:
+        return []
+    rank_col = rank_by or y
+    groups = {name: sub for name, sub in df.groupby(group_col, sort=False, observed=True)}
+    weight = df[rank_col].abs().groupby(df[group_col], sort=False, observed=True).sum()
+    order = weight.sort_values(ascending=False, kind='stable').index.tolist()
+
+    head, tail = order[:max_series], order[max_series:]
+    series = [(name, _plain(groups[name][x]), groups[name][y].to_numpy()) for name in head]
+    if tail:
+        rest = df[df[group_col].isin(tail)]
+        other = rest.groupby(x, sort=False, observed=True)[y].sum()
+        if isinstance(other.index, pd.CategoricalIndex):
+            other = other.sort_index()
+        series.append((OTHER_LABEL, _plain(other.index), other.to_numpy()))
+    return series
+
+
+def line_traces(df: pd.DataFrame, group_col: str, x: str, y: str, max_series=MAX_SERIES,
+                hovertemplate=None, mode='lines+markers', rank_by=None):
+    """
+    Scatter traces, one per group (plus "Other"), switching to Scattergl for large charts.
+    hovertemplate may use {name} for the series name plus the usual Plotly %{...} fields.
+    """
+    series = split_series(df, group_col, x, y, max_series=max_series, rank_by=rank_by)
+    n_points = sum(len(xs) for _, xs, _ in series)
+    use_webgl = len(series) > WEBGL_SERIES_THRESHOLD or n_points > WEBGL_POINT_THRESHOLD
+    trace_cls = go.Scattergl if use_webgl else go.Scatter
+
+    traces = []
+    for name, xs, ys in series:
+        kwargs = {}
+        if hovertemplate:
+            kwargs['hovertemplate'] = hovertemplate.replace('{name}', str(name))
+        traces.append(trace_cls(x=xs, y=ys, mode=mode, name=str(name), **kwargs))
+    return traces
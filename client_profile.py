@@ -0,0 +1,337 @@
+"""
+Data preparation for the Customer Profile page.
+
+Each function computes one section of the page from the frames returned by
+MySQLDatabase, so the page can run a section only when it is opened, and
+batch jobs can produce the same numbers without Streamlit.
+"""
+import numpy as np
+import pandas as pd
+
+from categories import compact
+
+
+ordered_months = ['Jan', 'Feb', 'March', 'April', 'May', 'June', 'July', 'August', 'September']
+month_order = ['All'] + ordered_months
+
+
+# -------------------------
+# Helpers
+# -------------------------
+def cv(series: pd.Series) -> float:
+    s = series.dropna().astype(float)
+    if s.mean() == 0:
+        return 0.0
+    return float(s.std(ddof=0) / s.mean()) * 100
+
+def ema_forecast(series: pd.Series, alpha: float = 0.4, horizon: int = 3) -> pd.Series:
+    s = series.dropna().astype(float)
+    if s.empty:
+        return pd.Series([0]*horizon)
+    level = s.iloc[0]
+    for val in s.iloc[1:]:
+        level = alpha*val + (1-alpha)*level
+    return pd.Series([level]*horizon)
+
+def month_sort_cat(s: pd.Series) -> pd.Series:
+    cat = pd.CategoricalDtype(categories=ordered_months, ordered=True)
+    return s.astype(str).astype(cat)
+
+def safe_sum(df, col):
+    return 0 if df.empty or col not in df.columns else float(df[col].sum())
+
+def order_months(df: pd.DataFrame) -> pd.DataFrame:
+    """Month column as an ordered categorical, rows sorted by month."""
+    if not df.empty and 'month' in df.columns:
+        df = df.copy()
+        df['month'] = pd.Categorical(df['month'], categories=month_order, ordered=True)
+        df = df.sort_values('month')
+    return df
+
+def share_of_route(sales: pd.DataFrame, totals: pd.DataFrame, value_col: str = 'total_sold_to_client'):
+    """
+    Route total and client share (%) for every row of `sales` (columns route, month, value_col),
+    looked up in the route x month totals matrix in one pass.
+    Returns (route_totals, shares) arrays: route/months without sales give a 0 total and 0 share,
+    rows without a month give NaN for both.
+    """
+    r = totals.index.get_indexer(sales['route'].astype(object))
+    m = totals.columns.get_indexer(sales['month'].astype(object))
+    found = (r >= 0) & (m >= 0)
+    route_totals = np.zeros(len(sales))
+    route_totals[found] = totals.to_numpy(dtype=float)[r[found], m[found]]
+    route_totals = np.nan_to_num(route_totals, nan=0.0)
+
+    values = sales[value_col].to_numpy(dtype=float)
+    shares = np.divide(values * 100, route_totals, out=np.zeros(len(sales)), where=route_totals != 0)
+    no_month = sales['month'].isna().to_numpy()
+    route_totals[no_month] = np.nan
+    shares[no_month] = np.nan
+    return route_totals, shares
+
+def build_boolean_basket_matrix(csd: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns a boolean month x product matrix (1 if qty > 0 in that month for that product).
+    """
+    if csd.empty:
+        return pd.DataFrame()
+    # Only this client's products become columns, not every label in the shared dictionary
+    csd = compact(csd)
+    mm = csd.pivot_table(index='month', columns='item_description',
+                         values='total_quantity_sold', aggfunc='sum', observed=False).fillna(0)
+    # keep only ordered months & cast to bool
+    mm = mm.loc[mm.index.isin(ordered_months)]
+    mm = (mm > 0).astype(int)
+    return mm
+
+def cross_sell_metrics(mm_bool: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute pair metrics for A->B:
+      - co_tx: months both A & B purchased
+      - support: co_tx / total months
+      - conf_A_B: co_tx / months(A)
+      - lift: support / (support(A) * support(B))
+    Returns a long DataFrame with columns:
+      ['A','B','co_tx','support_%','conf_A_B_%','lift','months_A','months_B','total_months']
+    """
+    if mm_bool.empty or mm_bool.shape[1] < 2 or mm_bool.shape[0] < 1:
+        return pd.DataFrame(columns=['A','B','co_tx','support_%','conf_A_B_%','lift','months_A','months_B','total_months'])
+
+    total_months = mm_bool.shape[0]
+    prod_counts = mm_bool.sum(axis=0)  # months purchased per product
+
+    rows = []
+    cols = list(mm_bool.columns)
+    for i, A in enumerate(cols):
+        a_count = int(prod_counts[A])
+        if a_count == 0:
+            continue
+        for j, B in enumerate(cols):
+            if A == B:
+                continue
+            b_count = int(prod_counts[B])
+            if b_count == 0:
+                continue
+            co_tx = int((mm_bool[A] & mm_bool[B]).sum())
+            if co_tx == 0:
+                continue
+            support = co_tx / total_months
+            conf_A_B = co_tx / a_count
+            # base probabilities
+            pA = a_count / total_months
+            pB = b_count / total_months
+            lift = (support / (pA * pB)) if (pA > 0 and pB > 0) else 0
+            rows.append({
+                'A': A, 'B': B,
+                'co_tx': co_tx,
+                'support_%': round(support*100, 1),
+                'conf_A_B_%': round(conf_A_B*100, 1),
+                'lift': round(lift, 2),
+                'months_A': a_count,
+                'months_B': b_count,
+                'total_months': total_months
+            })
+    df = pd.DataFrame(rows)
+    if not df.empty:
+        df = df.sort_values(['conf_A_B_%','lift','co_tx'], ascending=[False, False, False])
+    return df
+
+
+# -------------------------
+# Sections
+# -------------------------
+def active_months_frame(client_sales_detailed: pd.DataFrame) -> pd.DataFrame:
+    """Client month x product rows restricted to the observed months."""
+    if not client_sales_detailed.empty:
+        return client_sales_detailed[client_sales_detailed['month'].isin(ordered_months)].copy()
+    return client_sales_detailed.copy()
+
+def summary_metrics(csd: pd.DataFrame) -> dict:
+    """Basket, consistency, forecast and churn metrics for the summary block."""
+    # 1) Basket depth/breadth
+    basket_breadth = csd['item_description'].nunique() if not csd.empty else 0
+    total_qty_all = safe_sum(csd, 'total_quantity_sold')
+    avg_qty_per_product_per_month = 0
+    if not csd.empty:
+        months_active = csd['month'].nunique()
+        if months_active > 0 and basket_breadth > 0:
+            avg_qty_per_product_per_month = round(total_qty_all / (basket_breadth * months_active), 2)
+
+    top_dep_1 = top_dep_3 = top_dep_5 = 0
+    top_prod = None
+    if not csd.empty:
+        top_by_qty = csd.groupby('item_description', observed=True)['total_quantity_sold'].sum().sort_values(ascending=False)
+        top_prod = top_by_qty.index[0] if len(top_by_qty) else None
+        tot = float(top_by_qty.sum()) if top_by_qty.sum() else 1.0
+        top_dep_1 = round(top_by_qty.iloc[:1].sum() / tot * 100, 1) if len(top_by_qty) >= 1 else 0
+        top_dep_3 = round(top_by_qty.iloc[:3].sum() / tot * 100, 1) if len(top_by_qty) >= 3 else 0
+        top_dep_5 = round(top_by_qty.iloc[:5].sum() / tot * 100, 1) if len(top_by_qty) >= 5 else 0
+
+    # Repeat purchase ratio
+    repeat_ratio = 0
+    if not csd.empty:
+        counts = csd.groupby('item_description', observed=True)['month'].nunique()
+        if len(counts) > 0:
+            repeat_ratio = round((counts[counts >= 2].size / counts.size) * 100, 1)
+
+    # 2) Consistency & volatility
+    consistency_index = 0
+    cv_spend = 0.0
+    purchase_gaps = []
+    monthly_totals = pd.DataFrame()
+    idx_map = {m:i for i,m in enumerate(ordered_months)}
+    if not csd.empty:
+        # observed=False keeps months without purchases as zero rows
+        monthly_totals = csd.groupby('month', observed=False).agg(qty=('total_quantity_sold','sum'),
+                                                                  sales=('sales_amt','sum')).reset_index()
+        monthly_totals = monthly_totals[monthly_totals['month'].isin(ordered_months)]
+        months_observed = len(ordered_months)
+        months_bought = (monthly_totals['qty'] > 0).sum() if not monthly_totals.empty else 0
+        consistency_index = round((months_bought / months_observed) * 100, 1)
+        cv_spend = round(cv(monthly_totals['sales']) if monthly_totals['sales'].sum() > 0 else cv(monthly_totals['qty']), 1)
+        bought_months = monthly_totals.loc[monthly_totals['qty'] > 0, 'month'].astype(str).tolist()
+        purchase_gaps = [idx_map[b] - idx_map[a] for a, b in zip(bought_months, bought_months[1:])]
+
+    # 3) Forecast & value
+    forecast_basis = None
+    if not monthly_totals.empty:
+        monthly_totals_fc = monthly_totals.copy()
+        if monthly_totals_fc['sales'].sum() > 0:
+            forecast_basis = monthly_totals_fc.set_index('month')['sales']
+        else:
+            forecast_basis = monthly_totals_fc.set_index('month')['qty']
+    forecast_next3 = ema_forecast(forecast_basis, alpha=0.4, horizon=3) if forecast_basis is not None else pd.Series([0,0,0])
+    lifetime_value = round(float(forecast_basis.mean() * 12), 0) if forecast_basis is not None and forecast_basis.mean() > 0 else 0
+
+    churn_risk, churn_reason = churn_assessment(monthly_totals)
+
+    return {
+        'basket_breadth': basket_breadth,
+        'avg_qty_per_product_per_month': avg_qty_per_product_per_month,
+        'top_dep_1': top_dep_1, 'top_dep_3': top_dep_3, 'top_dep_5': top_dep_5,
+        'top_prod': top_prod,
+        'repeat_ratio': repeat_ratio,
+        'consistency_index': consistency_index,
+        'cv_spend': cv_spend,
+        'purchase_gaps': purchase_gaps,
+        'forecast_basis': forecast_basis,
+        'forecast_next3': forecast_next3,
+        'lifetime_value': lifetime_value,
+        'churn_risk': churn_risk,
+        'churn_reason': churn_reason,
+    }
+
+def churn_assessment(monthly_totals: pd.DataFrame):
+    """Churn classification + human-readable reason (based on month gaps)."""
+    churn_risk = "Low"
+    churn_reason = "Insufficient history to evaluate."
+    if monthly_totals.empty:
+        return churn_risk, churn_reason
+
+    # Build active month index list
+    act = monthly_totals.loc[monthly_totals['qty'] > 0, 'month'].astype(str).tolist()
+    idx_map = {m:i for i,m in enumerate(ordered_months)}
+    active_idx = [idx_map[m] for m in act if m in idx_map]
+    if not active_idx:
+        return churn_risk, churn_reason
+
+    # Last observed month in dataset (max month index present at all)
+    available_months = monthly_totals['month'].astype(str).dropna().unique().tolist()
+    available_idx = [idx_map[m] for m in available_months if m in idx_map]
+    last_available_idx = max(available_idx) if available_idx else max(active_idx)
+
+    last_active_idx = max(active_idx)
+    gap_months = last_available_idx - last_active_idx  # months since last purchase in the observed window
+
+    # Average purchase cycle (mean gap between active months)
+    avg_cycle = None
+    if len(active_idx) >= 2:
+        diffs = np.diff(sorted(active_idx))
+        avg_cycle = float(np.mean(diffs)) if len(diffs) else None
+
+    # Classify
+    if avg_cycle is None or avg_cycle == 0:
+        # Not enough history for a cycle; fall back to simple rule
+        churn_risk = "Low" if gap_months <= 1 else ("Medium" if gap_months == 2 else "High")
+        churn_reason = f"Last purchase was **{gap_months} month(s)** ago; not enough history to learn a usual cycle."
+    else:
+        mult = gap_months / avg_cycle if avg_cycle > 0 else 0
+        if gap_months <= avg_cycle * 1.5:
+            churn_risk = "Low"
+            churn_reason = f"Last purchase **{gap_months} month(s)** ago, within normal cycle (~{avg_cycle:.1f} months)."
+        elif gap_months <= avg_cycle * 2.5:
+            churn_risk = "Medium"
+            churn_reason = f"Last purchase **{gap_months} month(s)** ago, about **{mult:.1f}×** longer than usual cycle. **Recommend follow‑up.**"
+        else:
+            churn_risk = "High"
+            churn_reason = f"Last purchase **{gap_months} month(s)** ago, over **{mult:.1f}×** longer than usual. **Urgent recovery action needed.**"
+    return churn_risk, churn_reason
+
+def route_share(db, client_sales_route_df: pd.DataFrame):
+    """
+    Client share of its route per month.
+    Returns (route_name, client_sales_route_df with total_route_sales / client_share_%,
+             share_trend, client_vs_route_trend).
+    """
+    route_name = "Unknown Route"
+    share_trend = pd.DataFrame()
+    client_vs_route_trend = None
+    if client_sales_route_df.empty:
+        return route_name, client_sales_route_df, share_trend, client_vs_route_trend
+
+    client_sales_route_df = client_sales_route_df.copy()
+    route_name = client_sales_route_df['route'].dropna().astype(str).iloc[0] if 'route' in client_sales_route_df.columns else "Unknown Route"
+    route_totals, shares = share_of_route(client_sales_route_df.assign(route=route_name), db.get_route_month_totals())
+    client_sales_route_df['total_route_sales'] = route_totals
+    client_sales_route_df['client_share_%'] = np.round(shares, 1)
+    share_trend = client_sales_route_df.loc[client_sales_route_df['month'].isin(ordered_months), ['month','client_share_%']].dropna()
+
+    months_series = client_sales_route_df['month'].astype(str).reset_index(drop=True)
+    client_mom = client_sales_route_df['total_sold_to_client'].pct_change().reset_index(drop=True) * 100
+    route_mom = pd.Series(route_totals).pct_change().reset_index(drop=True) * 100
+    min_len = min(len(months_series), len(client_mom), len(route_mom))
+    client_vs_route_trend = pd.DataFrame({
+        'month': months_series.iloc[:min_len],
+        'client_mom_%': client_mom.iloc[:min_len].round(1),
+        'route_mom_%' : route_mom.iloc[:min_len].round(1),
+    })
+    return route_name, client_sales_route_df, share_trend, client_vs_route_trend
+
+def client_route_shares(db) -> pd.DataFrame:
+    """Every client's monthly sales with its route total and share (%) of it."""
+    sales = db.get_all_client_route_sales()
+    route_totals, shares = share_of_route(sales, db.get_route_month_totals())
+    return sales.assign(total_route_sales=route_totals, **{'client_share_%': np.round(shares, 1)})
+
+def route_dominance(db, month=None) -> pd.DataFrame:
+    """
+    Clients ranked within their route by share of the route's sales, over all
+    months or for one month, most dominant first. Columns: route, customer_name, total_sold_to_client,
+    total_route_sales, client_share_%, rank_in_route, clients_in_route.
+    """
+    sales = db.get_all_client_route_sales()
+    totals = db.get_route_month_totals()
+    if month is not None:
+        sales = sales[sales['month'] == month]
+        route_totals = totals[month] if month in totals.columns else pd.Series(dtype=float)
+    else:
+        route_totals = totals.sum(axis=1)
+    df = sales.groupby(['route', 'customer_name'], observed=True, as_index=False)['total_sold_to_client'].sum()
+    df['total_route_sales'] = route_totals.reindex(df['route'].astype(object)).fillna(0).to_numpy()
+    df['client_share_%'] = np.round(np.divide(df['total_sold_to_client'] * 100, df['total_route_sales'],
+                                              out=np.zeros(len(df)), where=df['total_route_sales'].to_numpy() != 0), 1)
+    df = df.sort_values('client_share_%', ascending=False, kind='stable')
+    df['rank_in_route'] = df.groupby('route', observed=True).cumcount() + 1
+    df['clients_in_route'] = df.groupby('route', observed=True)['customer_name'].transform('size')
+    return df.reset_index(drop=True)
+
+def product_changes(client_sales_detailed: pd.DataFrame) -> pd.DataFrame:
+    """Month-to-month quantity/sales change per product."""
+    csd2 = client_sales_detailed.copy()
+    csd2['month'] = month_sort_cat(csd2['month'])
+    csd2 = csd2.sort_values(['item_description','month'])
+
+    csd2['qty_change'] = csd2.groupby('item_description', observed=True)['total_quantity_sold'].diff().fillna(0)
+    csd2['sales_change'] = csd2.groupby('item_description', observed=True)['sales_amt'].diff().fillna(0)
+    csd2['pct_change'] = (csd2.groupby('item_description', observed=True)['total_quantity_sold'].pct_change() * 100).fillna(0)
+    return csd2
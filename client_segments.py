@@ -0,0 +1,133 @@
+"""
+Top-X% client segments of a client type, answered from memory.
+
+The All Client Types page cuts the clients of a type, ranked by total sales,
+at a percentage slider. ClientSegments keeps, for one client type:
+
+- the clients in rank order, with running (prefix) sums of their total and
+  monthly (Jan-Sep) sales, so the totals of any cut are one array lookup;
+- the month x product sales of every client, ordered by the client's rank,
+  so the top k clients own the first rows and a cut's product breakdown is
+  summed (numpy.bincount) from a prefix of the cached arrays.
+
+Every percentage therefore resolves to a slice; no query is sent after the
+segments are built (MySQLDatabase.get_client_segments). Breakdowns are
+memoized per number of selected clients, since many percentages select the
+same clients. The cut is int(n_clients * percentage / 100), the same as
+MySQLDatabase.get_client_segment().
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import categories
+
+
+MONTH_COLUMNS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep']
+_MAX_RESULTS = 128  # memoized product breakdowns per ClientSegments
+
+
+class ClientSegments():
+    def __init__(self, clients: pd.DataFrame, product_sales: pd.DataFrame, overall_total=None):
+        """
+        clients: one row per client in rank order (best first): bp_name, total_sales, Jan..Sep.
+        product_sales: bp_name, month, item_description, total_sales_amt, total_quantity_sold
+        per client; rows of clients not in `clients` are ignored.
+        overall_total: total sales of all customers.
+        """
+        self.overall_total = overall_total
+        self.names = clients['bp_name'].astype(object).to_numpy()
+        self.totals = clients['total_sales'].to_numpy(dtype=float)
+        self.months = clients[MONTH_COLUMNS].to_numpy(dtype=float)
+        self.type_total = self.totals.sum() if len(self.totals) else None
+        self._cum_totals = np.concatenate([[0.0], np.cumsum(self.totals)])
+        self._cum_months = np.vstack([np.zeros((1, len(MONTH_COLUMNS))), np.cumsum(self.months, axis=0)])
+
+        # Product rows in client rank order; the top k clients own the first _row_ends[k] rows
+        positions = pd.Index(self.names).get_indexer(product_sales['bp_name'].astype(object))
+        kept = np.flatnonzero(positions >= 0)
+        kept = kept[np.argsort(positions[kept], kind='stable')]
+        rows = product_sales.iloc[kept]
+        self._row_ends = np.searchsorted(positions[kept], np.arange(len(self.names) + 1), side='left')
+
+        month_codes, self._month_labels = pd.factorize(rows['month'].astype(object), use_na_sentinel=False)
+        product_codes, self._product_labels = pd.factorize(rows['item_description'].astype(object), use_na_sentinel=False)
+        self._month_labels = np.asarray(self._month_labels, dtype=object)
+        self._product_labels = np.asarray(self._product_labels, dtype=object)
+        self._cells = product_codes * len(self._month_labels) + month_codes
+        self._amounts = rows['total_sales_amt'].to_numpy(dtype=float)
+        self._quantities = rows['total_quantity_sold'].to_numpy(dtype=float)
+
+        self._breakdowns = OrderedDict()  # number of clients -> product breakdown
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        state['_breakdowns'] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def cut(self, percentage) -> int:
+        """Number of clients in the top `percentage` %."""
+        return int(len(self) * (percentage / 100))
+
+    def selected_total(self, percentage):
+        """Total sales of the top `percentage` % of the clients."""
+        return self._cum_totals[self.cut(percentage)]
+
+    def monthly_totals(self, percentage) -> pd.Series:
+        """Jan..Sep sales of the top `percentage` % of the clients."""
+        return pd.Series(self._cum_months[self.cut(percentage)], index=MONTH_COLUMNS)
+
+    def segment(self, percentage):
+        """
+        (clients DataFrame [client_name, total_sales, Jan..Sep], client type total, overall total)
+        for the top `percentage` %, like MySQLDatabase.get_client_segment().
+        """
+        if not len(self):
+            return pd.DataFrame(columns=['client_name', 'total_sales']), None, None
+        k = self.cut(percentage)
+        clients = pd.DataFrame({'client_name': self.names[:k], 'total_sales': self.totals[:k]})
+        clients[MONTH_COLUMNS] = self.months[:k]
+        return categories.encode(clients), self.type_total, self.overall_total
+
+    def product_sales(self, percentage) -> pd.DataFrame:
+        """
+        Month x product sales of the top `percentage` % of the clients:
+        month, item_description, total_sales_amt, total_quantity_sold, ordered by month then sales.
+        """
+        k = self.cut(percentage)
+        with self._lock:
+            result = self._breakdowns.get(k)
+            if result is not None:
+                self._breakdowns.move_to_end(k)
+                return result.copy()
+
+        end = self._row_ends[k]
+        n_months = len(self._month_labels)
+        n_cells = n_months * len(self._product_labels)
+        cells = self._cells[:end]
+        present = np.flatnonzero(np.bincount(cells, minlength=n_cells))
+        result = pd.DataFrame({
+            'month': self._month_labels[present % n_months] if n_months else [],
+            'item_description': self._product_labels[present // n_months] if n_months else [],
+            'total_sales_amt': np.bincount(cells, weights=self._amounts[:end], minlength=n_cells)[present],
+            'total_quantity_sold': np.bincount(cells, weights=self._quantities[:end], minlength=n_cells)[present],
+        })
+        result = result.sort_values(['month', 'total_sales_amt'], ascending=[True, False], kind='stable')
+        result = categories.encode(result.reset_index(drop=True))
+
+        with self._lock:
+            self._breakdowns[k] = result
+            while len(self._breakdowns) > _MAX_RESULTS:
+                self._breakdowns.popitem(last=False)
+        return result.copy()
@@ -0,0 +1,306 @@
+"""
+Columnar (Parquet) copy of the sales tables.
+
+export_tables() copies customer_wise_sales, sales_per_client,
+route_wise_sales and customer_master out of MySQL into COLUMNAR_DIR, one
+Parquet dataset per table. The sales tables are partitioned by month
+(month=<label>/ directories) and sorted by product / customer inside each
+partition, so the min/max statistics Parquet keeps for every row group
+are narrow. read_table() hands month, product and customer filters to
+pyarrow, which skips the partitions and row groups whose statistics rule
+the value out, so a read costs roughly the size of the selected slice.
+
+ColumnarDatabase is a drop-in MySQLDatabase that answers the per-month,
+per-product and per-client queries from that copy. Methods it does not
+override still query MySQL.
+
+    python columnar.py                          # export all four tables
+    python columnar.py sales_per_client         # selected tables
+
+Requires pyarrow. The location defaults to ./columnar next to this module
+and can be moved with the KENAFRIC_COLUMNAR_DIR environment variable.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+import categories
+from conn1 import EXPORT_TABLES, MySQLDatabase
+import tracing
+
+
+COLUMNAR_DIR = os.environ.get(
+    'KENAFRIC_COLUMNAR_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'columnar'),
+)
+ROW_GROUP_ROWS = 8192
+
+# table -> (partition column, sort order inside each partition)
+LAYOUT = {
+    'customer_wise_sales': ('month', ['customer_code']),
+    'sales_per_client': ('month', ['item_description', 'customer_code']),
+    'route_wise_sales': ('month', ['route']),
+    'customer_master': (None, ['bp_code']),
+}
+
+MONTHS = ['Jan', 'Feb', 'March', 'April', 'May', 'June',
+          'July', 'August', 'September', 'October', 'November', 'December']
+
+# path -> ((inode, mtime), pyarrow Dataset); refreshed when an export replaces the directory
+_datasets = {}
+_datasets_lock = threading.Lock()
+
+# (root, aggregate name) -> export stamps of the tables it was last built from
+_aggregate_stamps = {}
+_aggregate_stamps_lock = threading.Lock()
+
+
+def export_table(db, table, root=COLUMNAR_DIR):
+    """Write one table as a Parquet dataset under root/<table>, replacing the previous export. Returns rows written."""
+    partition, sort_by = LAYOUT[table]
+    df = db.get_table(table)
+    # Plain strings: Parquet dictionary-encodes them per column chunk on its own
+    df = df.astype({c: object for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+    order = ([partition] if partition else []) + [c for c in sort_by if c in df.columns]
+    if order:
+        df = df.sort_values(order, kind='stable')
+
+    os.makedirs(root, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=root, prefix=f".{table}-")
+    try:
+        ds.write_dataset(
+            pa.Table.from_pandas(df, preserve_index=False),
+            tmp_dir,
+            format='parquet',
+            partitioning=[partition] if partition else None,
+            partitioning_flavor='hive' if partition else None,
+            max_rows_per_group=ROW_GROUP_ROWS,
+            existing_data_behavior='overwrite_or_ignore',
+        )
+        path = os.path.join(root, table)
+        old_dir = None
+        if os.path.exists(path):
+            old_dir = tempfile.mkdtemp(dir=root, prefix=f".{table}-old-")
+            os.replace(path, os.path.join(old_dir, table))
+        os.replace(tmp_dir, path)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return len(df)
+
+
+def export_tables(db, tables=EXPORT_TABLES, root=COLUMNAR_DIR):
+    """Export each table; returns {table: rows}."""
+    return {table: export_table(db, table, root) for table in tables}
+
+
+def _stamp(table, root):
+    """Identity of the current export of `table` (a new export replaces the directory)."""
+    st = os.stat(os.path.join(root, table))
+    return (st.st_ino, st.st_mtime_ns)
+
+
+def _dataset(table, root):
+    path = os.path.join(root, table)
+    stamp = _stamp(table, root)
+    with _datasets_lock:
+        cached = _datasets.get(path)
+        if cached is None or cached[0] != stamp:
+            partition = LAYOUT[table][0]
+            cached = _datasets[path] = (stamp, ds.dataset(path, format='parquet',
+                                                          partitioning='hive' if partition else None))
+    return cached[1]
+
+
+def read_table(table, columns=None, root=COLUMNAR_DIR, **filters):
+    """
+    Rows of an exported table as a DataFrame. Each keyword filter is
+    column=value or column=[values]; the filters are pushed down to skip
+    partitions and row groups. Label columns are encoded as in MySQLDatabase.
+    """
+    expr = None
+    for column, value in filters.items():
+        if isinstance(value, (list, tuple, set)):
+            term = ds.field(column).isin(list(value))
+        else:
+            term = ds.field(column) == value
+        expr = term if expr is None else expr & term
+    with tracing.span('query', f"parquet:{table}"):
+        return categories.encode(_dataset(table, root).to_table(columns=columns, filter=expr).to_pandas())
+
+
+def _by_label(values):
+    # Sort key: categoricals by label, as MySQL's ORDER BY would, not by dictionary code
+    return values.astype(object) if isinstance(values.dtype, pd.CategoricalDtype) else values
+
+
+def _month_sorted(df):
+    # Same order as MySQL's ORDER BY FIELD(month, ...): unlisted labels first, then calendar order
+    rank = df['month'].astype(object).map({m: i + 1 for i, m in enumerate(MONTHS)}).fillna(0)
+    return df.iloc[rank.argsort(kind='stable')].reset_index(drop=True)
+
+
+class ColumnarDatabase(MySQLDatabase):
+    """MySQLDatabase whose sales queries read the Parquet export; fallback=False never opens MySQL."""
+
+    def __init__(self, root=COLUMNAR_DIR, fallback=True):
+        super().__init__()
+        self.root = root
+        self.fallback = fallback
+
+    def connect(self, pooled=False):
+        missing = [t for t in EXPORT_TABLES if not os.path.isdir(os.path.join(self.root, t))]
+        if missing:
+            raise FileNotFoundError(f"No columnar export of {', '.join(missing)} in {self.root}; run columnar.py first")
+        if self.fallback:
+            super().connect(pooled)
+
+    def _cache_key(self, name):
+        # Aggregates built from Parquet are never served to (or taken from) MySQL-backed callers
+        return ('parquet', os.path.abspath(self.root), name)
+
+    def _cached_over(self, name, tables, build, refresh=False):
+        """
+        _cached() value of `name` keyed by the export stamps of `tables`, so a new export is
+        a new entry; the entry of the previous export is dropped.
+        """
+        stamps = tuple(_stamp(t, self.root) for t in tables)
+        with _aggregate_stamps_lock:
+            previous = _aggregate_stamps.get((self.root, name))
+            _aggregate_stamps[(self.root, name)] = stamps
+        if previous is not None and previous != stamps:
+            self._forget((name, previous))
+        return self._cached((name, stamps), build, refresh)
+
+    def _read(self, table, columns=None, **filters):
+        return read_table(table, columns, self.root, **filters)
+
+    def _codes_for(self, bp_name=None, group_code=None):
+        filters = {k: v for k, v in (('bp_name', bp_name), ('group_code', group_code)) if v is not None}
+        return self._read('customer_master', ['bp_code'], **filters)['bp_code'].tolist()
+
+    def get_overall_sales_per_month(self):
+        df = self._read('customer_wise_sales', ['month', 'total_ar_invoice'])
+        df = df.groupby('month', as_index=False, observed=True).agg(total_sales=('total_ar_invoice', 'sum'))
+        return _month_sorted(df)
+
+    def get_route_sales_per_month(self):
+        df = self._read('route_wise_sales', ['route', 'month', 'amount'])
+        return (df.groupby(['route', 'month'], as_index=False, observed=True).agg(total_sales=('amount', 'sum'))
+                .sort_values(['route', 'month'], key=_by_label).reset_index(drop=True))
+
+    def get_client_sales(self, client_name):
+        master = self._read('customer_master', ['bp_code', 'route'], bp_name=client_name)
+        sales = self._read('customer_wise_sales', ['customer_code', 'month', 'total_ar_invoice'],
+                           customer_code=master['bp_code'].tolist())
+        df = sales.merge(master, left_on='customer_code', right_on='bp_code')
+        return (df.groupby(['month', 'route'], as_index=False, observed=True, dropna=False)
+                .agg(total_sold_to_client=('total_ar_invoice', 'sum'))
+                [['month', 'total_sold_to_client', 'route']])
+
+    def get_route_month_totals(self, refresh=False):
+        def build():
+            df = self._read('route_wise_sales', ['route', 'month', 'amount']).astype({'route': object, 'month': object})
+            return df.groupby(['route', 'month'])['amount'].sum().unstack('month')
+        return self._cached_over('route_month_totals', ['route_wise_sales'], build, refresh)
+
+    def get_all_client_route_sales(self, refresh=False):
+        def build():
+            master = self._read('customer_master', ['bp_code', 'bp_name', 'route', 'sales_manager', 'group_code'])
+            sales = self._read('customer_wise_sales', ['customer_code', 'month', 'total_ar_invoice'])
+            df = sales.merge(master, left_on='customer_code', right_on='bp_code').rename(columns={'bp_name': 'customer_name'})
+            return (df.groupby(['customer_name', 'route', 'sales_manager', 'group_code', 'month'],
+                               as_index=False, observed=True, dropna=False)
+                    .agg(total_sold_to_client=('total_ar_invoice', 'sum')))
+        return self._cached_over('client_route_sales', ['customer_master', 'customer_wise_sales'], build, refresh)
+
+    def get_top_clients_for_product(self, product, month, limit=None):
+        filters = {'item_description': product}
+        if month != 'All':
+            filters['month'] = month
+        df = self._read('sales_per_client', ['customer_name', 'quantity', 'sales_amt'], **filters)
+        df = (df.groupby('customer_name', as_index=False, observed=True)
+              .agg(total_quantity_sold=('quantity', 'sum'), total_sales_amount=('sales_amt', 'sum'))
+              .sort_values('total_quantity_sold', ascending=False))
+        if limit:
+            df = df.head(int(limit))
+        return df.reset_index(drop=True)
+
+    def get_sales_distribution_by_route(self, product, month):
+        filters = {'item_description': product}
+        if month != 'All':
+            filters['month'] = month
+        sales = self._read('sales_per_client', ['customer_code', 'quantity'], **filters)
+        master = self._read('customer_master', ['bp_code', 'route'], bp_code=sales['customer_code'].unique().tolist())
+        df = sales.merge(master, left_on='customer_code', right_on='bp_code')
+        return (df.groupby('route', as_index=False, observed=True, dropna=False).agg(total_quantity_sold=('quantity', 'sum'))
+                .sort_values('total_quantity_sold', ascending=False).reset_index(drop=True))
+
+    def get_client_product_sales(self, client_name, selected_month=None):
+        filters = {'customer_name': client_name}
+        if selected_month and selected_month != 'All':
+            filters['month'] = selected_month
+        df = self._read('sales_per_client', ['customer_name', 'item_description', 'quantity'], **filters)
+        return df.groupby(['customer_name', 'item_description'], as_index=False, observed=True).agg(
+            total_quantity_sold=('quantity', 'sum'))
+
+    def get_client_sales_per_month(self, client_name):
+        df = self._read('sales_per_client', ['item_description', 'month', 'quantity', 'sales_amt'],
+                        customer_name=client_name)
+        return (df.groupby(['item_description', 'month'], as_index=False, observed=True)
+                .agg(total_quantity_sold=('quantity', 'sum'), sales_amt=('sales_amt', 'sum'))
+                .sort_values('month', kind='stable', key=_by_label).reset_index(drop=True))
+
+    def get_all_clients_product_sales(self, selected_month):
+        filters = {'customer_code': self._codes_for(group_code='DISTRIBUTORS')}
+        if selected_month != 'All':
+            filters['month'] = selected_month
+        df = self._read('sales_per_client', ['item_description', 'quantity'], **filters)
+        return (df.groupby('item_description', as_index=False, observed=True).agg(total_quantity_sold=('quantity', 'sum'))
+                .sort_values('total_quantity_sold', ascending=False).reset_index(drop=True))
+
+    def get_client_product_sales_detailed(self, client_name):
+        df = self._read('sales_per_client', ['month', 'item_description', 'quantity', 'sales_amt'],
+                        customer_code=self._codes_for(bp_name=client_name))
+        return df.groupby(['month', 'item_description'], as_index=False, observed=True).agg(
+            total_quantity_sold=('quantity', 'sum'), sales_amt=('sales_amt', 'sum'))
+
+    def get_monthly_product_quantities(self):
+        df = self._read('sales_per_client', ['month', 'item_description', 'quantity', 'sales_amt'])
+        return df.groupby(['month', 'item_description'], as_index=False, observed=True).agg(
+            total_quantity_sold=('quantity', 'sum'), total_sales_amt=('sales_amt', 'sum'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the sales tables to Parquet")
+    parser.add_argument('tables', nargs='*', help=f"tables to export (default: all of {', '.join(EXPORT_TABLES)})")
+    parser.add_argument('--root', default=COLUMNAR_DIR, help="output directory")
+    args = parser.parse_args()
+    unknown = [t for t in args.tables if t not in EXPORT_TABLES]
+    if unknown:
+        parser.error(f"unknown table(s): {', '.join(unknown)}")
+
+    db = MySQLDatabase()
+    db.connect()
+    if db.conn is None:
+        raise SystemExit("Could not connect to MySQL")
+    try:
+        for table in args.tables or EXPORT_TABLES:
+            started = time.perf_counter()
+            rows = export_table(db, table, args.root)
+            print(f"{table}: {rows} rows in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,71 @@
+import json
+import os
+import sys
+import threading
+import time
+
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
 import pandas as pd
+import categories
+from client_segments import ClientSegments
+from name_index import NameIndex
+import result_store
+from singleflight import SingleFlight
+import slow_queries
+import top_n
+import tracing
+
+
+# Process-wide store for bulk aggregates that are computed once and then served
+# as lookups. Shared by every MySQLDatabase instance (i.e. across page reruns).
+# An entry is rebuilt on first use after PRECOMPUTED_TTL seconds, or once the
+# data version (result_store.data_version, bumped by refresh_precomputed) changes.
+_precomputed = {}  # MySQLDatabase._cache_key(name) -> (value, data version, built at)
+_precomputed_lock = threading.Lock()
+PRECOMPUTED_TTL = float(os.environ.get('KENAFRIC_PRECOMPUTED_TTL', 6 * 3600))
+
+# Connection settings; each one can be overridden through the environment
+DB_CONFIG = {
+    'host': os.environ.get('KENAFRIC_DB_HOST', "database-1.c9wq6somacoq.ap-south-1.rds.amazonaws.com"),
+    'user': os.environ.get('KENAFRIC_DB_USER', "beeshaker"),
+    'password': os.environ.get('KENAFRIC_DB_PASSWORD', "eNJD7QvFIT1"),
+    'database': os.environ.get('KENAFRIC_DB_NAME', "kenafric"),
+}
+
+# Process-wide connection pools for multi-threaded callers (api.py), one per database, created on first use
+POOL_SIZE = 8
+_pools = {}
+_pool_lock = threading.Lock()
+
+# Identical queries running at the same time (several sessions opening the same
+# page) are sent to MySQL once; the other callers get a copy of that result.
+_in_flight = SingleFlight(copy=lambda df: df.copy())
+
+# Tables copied out of MySQL in full by columnar.py
+EXPORT_TABLES = ('customer_wise_sales', 'sales_per_client', 'route_wise_sales', 'customer_master')
 
 
+def _is_current(entry):
+    return (entry is not None and entry[1] == result_store.data_version()
+            and time.monotonic() - entry[2] <= PRECOMPUTED_TTL)
+
+
+def refresh_precomputed():
+    """Call after a data load: every process (pages, API) rebuilds its precomputed aggregates on next use."""
+    result_store.mark_data_loaded()
+    with _precomputed_lock:
+        _precomputed.clear()
+
 
 class MySQLDatabase():
-    def __init__(self):
-        
-        self.host = "database-1.c9wq6somacoq.ap-south-1.rds.amazonaws.com"
-        self.user = "beeshaker"
-        self.password = "eNJD7QvFIT1"
-        self.database = "kenafric"
+    def __init__(self, **config):
+        """Connection settings from DB_CONFIG; keyword arguments (host, user, password, database) override them."""
+        settings = {**DB_CONFIG, **config}
+        self.host = settings['host']
+        self.user = settings['user']
+        self.password = settings['password']
+        self.database = settings['database']
         self.conn = None
         self.cursor = None
         '''
@@ -21,21 +76,35 @@ class MySQLDatabase():
         self.conn = None
         self.cursor = None
         '''
-        
-        
-      
-        
-        
 
-    def connect(self):
-        """Establish a connection to the database."""
+    def _get_pool(self):
+        key = (self.host, self.database)
+        with _pool_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = pooling.MySQLConnectionPool(
+                    pool_name=f"kenafric{len(_pools)}",
+                    pool_size=POOL_SIZE,
+                    host=self.host,
+                    user=self.user,
+                    password=self.password,
+                    database=self.database
+                )
+        return pool
+
+    def connect(self, pooled=False):
+        """Establish a connection to the database; pooled=True borrows one from the shared pool."""
         try:
-            self.conn = mysql.connector.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                database=self.database
-            )
+            if pooled:
+                # close() hands a pooled connection back to the pool instead of closing it
+                self.conn = self._get_pool().get_connection()
+            else:
+                self.conn = mysql.connector.connect(
+                    host=self.host,
+                    user=self.user,
+                    password=self.password,
+                    database=self.database
+                )
             if self.conn.is_connected():
                 self.cursor = self.conn.cursor(buffered=True)
                 print("Connection to MySQL database successful")
@@ -51,6 +120,74 @@ class MySQLDatabase():
             self.conn.close()
             print("Connection closed")
 
+    def _read_sql(self, query, params=None):
+        """pd.read_sql timed per calling method; concurrent identical queries share one round trip."""
+        code = sys._getframe(1).f_code
+        # Queries issued from a method's local builder (see _cached) are attributed to the method
+        method = getattr(code, 'co_qualname', code.co_name).split('.<locals>')[0].rsplit('.', 1)[-1]
+        key = (self.host, self.database, query, tuple(params) if params else ())
+        with tracing.span('query', method):
+            return _in_flight.do(key, lambda: self._run_query(method, query, params))
+
+    def _run_query(self, method, query, params=None):
+        """Run one query; label columns come back as shared categoricals (see categories.py)."""
+        started = time.perf_counter()
+        df = pd.read_sql(query, self.conn, params=params)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if slow_queries.record(method, elapsed_ms):
+            slow_queries.log_slow_query(method, query, params, elapsed_ms, len(df), self._explain(query, params))
+        return categories.encode(df)
+
+    def _cache_key(self, name):
+        """Key of `name` in _precomputed: values are kept per data source."""
+        return (self.host, self.database, name)
+
+    def _cached(self, name, build, refresh=False):
+        """
+        Process-wide value `name` for this database, from build(). Built on first use and
+        rebuilt when older than PRECOMPUTED_TTL, when the data version has changed, or on refresh=True.
+        """
+        key = self._cache_key(name)
+        with _precomputed_lock:
+            entry = _precomputed.get(key)
+        if refresh or not _is_current(entry):
+            version = result_store.data_version()
+            entry = (build(), version, time.monotonic())
+            with _precomputed_lock:
+                _precomputed[key] = entry
+        return entry[0]
+
+    def is_cached(self, name):
+        """True when `name` is cached for this database and still current (a lookup needs no query)."""
+        with _precomputed_lock:
+            entry = _precomputed.get(self._cache_key(name))
+        return _is_current(entry)
+
+    def _forget(self, *names):
+        """Drop cached values of this database so they are rebuilt on next use."""
+        with _precomputed_lock:
+            for name in names:
+                _precomputed.pop(self._cache_key(name), None)
+
+    def _explain(self, query, params=None):
+        """EXPLAIN FORMAT=JSON plan of a SELECT, or {'error': ...} if it cannot be explained."""
+        try:
+            cursor = self.conn.cursor(buffered=True)
+            try:
+                cursor.execute("EXPLAIN FORMAT=JSON " + query.strip().rstrip(';'), params or ())
+                row = cursor.fetchone()
+            finally:
+                cursor.close()
+            return json.loads(row[0]) if row else None
+        except (Error, ValueError) as e:
+            return {'error': str(e)}
+
+    def get_table(self, table):
+        """Every row of one of EXPORT_TABLES (input for the columnar export)."""
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"Not an exportable table: {table}")
+        return self._read_sql(f"SELECT * FROM {table};")
+
 
     def get_overall_sales_per_month(self):
         """
@@ -67,7 +204,7 @@ class MySQLDatabase():
                     FIELD(month, 'Jan', 'Feb', 'March', 'April', 'May', 'June', 
                                 'July', 'August', 'September', 'October', 'November', 'December');
         """
-        df = pd.read_sql(query, self.conn)
+        df = self._read_sql(query)
         return df
 
 
@@ -80,20 +217,15 @@ class MySQLDatabase():
         ORDER BY total_sales DESC 
         LIMIT 5
         """
-        df = pd.read_sql(query, self.conn)
+        df = self._read_sql(query)
         return df
 
     # Query top 5 routes by total sales
     def get_top_routes(self):
-        query = """
-        SELECT route, SUM(amount) as total_sales 
-        FROM route_wise_sales 
-        GROUP BY route 
-        ORDER BY total_sales DESC 
-        LIMIT 5
-        """
-        df = pd.read_sql(query, self.conn)
-        return df
+        # Partial selection over the in-memory route x month matrix
+        routes = self.get_route_month_totals().sum(axis=1)
+        df = pd.DataFrame({'route': routes.index.to_numpy(), 'total_sales': routes.to_numpy()})
+        return categories.encode(top_n.top_k(df, 'total_sales', 5))
 
     # Query top 5 items by total sales
     def get_top_items(self):
@@ -104,7 +236,7 @@ class MySQLDatabase():
         ORDER BY total_sales DESC 
         LIMIT 5
         """
-        df = pd.read_sql(query, self.conn)
+        df = self._read_sql(query)
         return df
             
     
@@ -117,7 +249,7 @@ class MySQLDatabase():
         ORDER BY SUM(total_ar_invoice) DESC
         LIMIT 5
         """
-        top_customers_df = pd.read_sql(top_customers_query, self.conn)
+        top_customers_df = self._read_sql(top_customers_query)
         top_customers_list = top_customers_df['customer_name'].tolist()
 
         # Step 2: Dynamically build SQL query to get monthly sales for those top 5 customers
@@ -131,7 +263,7 @@ class MySQLDatabase():
         """
         
         # Execute query with top customer names as parameters
-        df = pd.read_sql(query, self.conn, params=top_customers_list)
+        df = self._read_sql(query, params=top_customers_list)
         return df
 
     def get_route_sales_per_month(self):
@@ -141,39 +273,42 @@ class MySQLDatabase():
         GROUP BY route, month
         ORDER BY route, month;
         """
-        df = pd.read_sql(query, self.conn)
+        df = self._read_sql(query)
         return df
     
-    # New method to get customer sales per route
-    def get_customer_sales_per_route(self):
-        query = """
-        SELECT * FROM (
-            SELECT 
-                route_wise_sales.route, 
-                customer_master.bp_name AS customer_name, 
-                customer_wise_sales.month, 
-                SUM(customer_wise_sales.total_ar_invoice) AS total_sales,
-                ROW_NUMBER() OVER (PARTITION BY route_wise_sales.route ORDER BY SUM(customer_wise_sales.total_ar_invoice) DESC) AS rankk
-            FROM 
-                customer_wise_sales
-            JOIN 
-                customer_master ON customer_wise_sales.customer_code = customer_master.bp_code
-            JOIN 
-                route_wise_sales ON customer_master.route = route_wise_sales.route
-            GROUP BY 
-                route_wise_sales.route, customer_master.bp_name, customer_wise_sales.month
-        ) AS ranked_customers
-        WHERE rankk<= 5
-        ORDER BY route, month;
+    def get_customer_sales_per_route(self, limit=5, refresh=False):
         """
-        df = pd.read_sql(query, self.conn)
-        return df
+        Monthly sales of the top `limit` customers of every route (ranked by their
+        total over all months), with their rank, from the in-memory client aggregate.
+        The route comes from customer_master, so no row is multiplied by route_wise_sales.
+        Columns: route, customer_name, month, total_sales, rankk
+        """
+        def build():
+            sales = self.get_all_client_route_sales(refresh)
+            # Top customers per route by partial selection over the client aggregate
+            ranked = top_n.top_totals(sales, 'customer_name', 'total_sold_to_client', int(limit), group='route')
+            ranked = ranked[ranked['route'].notna()].drop(columns='total_sold_to_client')
+            ranked['rankk'] = ranked.groupby('route', observed=True).cumcount() + 1
+            monthly = sales.groupby(['route', 'customer_name', 'month'], observed=True, as_index=False)['total_sold_to_client'].sum()
+            df = ranked.merge(monthly, on=['route', 'customer_name']).rename(columns={'total_sold_to_client': 'total_sales'})
+            df = df.sort_values(['route', 'rankk'], kind='stable', key=lambda s: s.astype(object) if s.name == 'route' else s)
+            return df[['route', 'customer_name', 'month', 'total_sales', 'rankk']].reset_index(drop=True)
+        return self._cached(f'customer_sales_per_route_{int(limit)}', build, refresh).copy()
     
     
+    def get_client_name_index(self, refresh=False):
+        """NameIndex over distributor names (bp_name) with their bp_code, kept in memory (see _cached)."""
+        def build():
+            query = "SELECT DISTINCT bp_name, bp_code FROM customer_master where group_code = 'DISTRIBUTORS';"
+            df = self._read_sql(query)
+            return NameIndex(df['bp_name'].tolist(), df['bp_code'].tolist())
+        return self._cached('client_name_index', build, refresh)
+
     def get_all_clients(self):
-        query = "SELECT DISTINCT bp_name FROM customer_master where group_code = 'DISTRIBUTORS';"
-        df = pd.read_sql(query, self.conn)
-        return df['bp_name'].tolist()
+        return list(self.get_client_name_index().names)
+
+    def search_clients(self, query, limit=50):
+        return self.get_client_name_index().search(query, limit=limit)
 
     def get_client_sales(self, client_name):
         query = """
@@ -190,23 +325,61 @@ class MySQLDatabase():
         GROUP BY 
             customer_wise_sales.month, customer_master.route;
         """
-        df = pd.read_sql(query, self.conn, params=[client_name])
+        df = self._read_sql(query, params=[client_name])
         return df
 
-    def get_route_sales_for_client(self, route, month):
-        query = """
-        SELECT SUM(amount) AS total_route_sales
-        FROM route_wise_sales
-        WHERE route = %s AND month = %s;
+    def get_route_month_totals(self, refresh=False):
+        """
+        route x month matrix of SUM(amount) from route_wise_sales, built in one
+        aggregate and kept in memory (see _cached).
         """
-        df = pd.read_sql(query, self.conn, params=[route, month])
+        def build():
+            query = """
+                SELECT route, month, SUM(amount) AS total_route_sales
+                FROM route_wise_sales
+                GROUP BY route, month;
+            """
+            df = self._read_sql(query).astype({'route': object, 'month': object})
+            return df.pivot(index='route', columns='month', values='total_route_sales')
+        return self._cached('route_month_totals', build, refresh)
+
+    def get_route_sales_for_client(self, route, month):
+        totals = self.get_route_month_totals()
+        value = totals.at[route, month] if route in totals.index and month in totals.columns else None
 
-        # If the result is None or empty, return 0, otherwise return the total sales
-        return df['total_route_sales'].values[0] if not df.empty and pd.notna(df['total_route_sales'].values[0]) else 0
+        # Routes/months without sales count as 0
+        return value if pd.notna(value) else 0
 
-    def get_top_clients_for_product(self,product, month):
-        if month == 'All':
+    def get_all_client_route_sales(self, refresh=False):
+        """
+        Monthly sales of every client with its route, sales manager and client type, kept in memory
+        (see _cached). Input for the full route-share table and for the top-N questions over clients.
+        """
+        def build():
             query = """
+                SELECT
+                    customer_master.bp_name AS customer_name,
+                    customer_master.route,
+                    customer_master.sales_manager,
+                    customer_master.group_code,
+                    customer_wise_sales.month,
+                    SUM(customer_wise_sales.total_ar_invoice) AS total_sold_to_client
+                FROM
+                    customer_wise_sales
+                JOIN
+                    customer_master ON customer_wise_sales.customer_code = customer_master.bp_code
+                GROUP BY
+                    customer_master.bp_name, customer_master.route, customer_master.sales_manager,
+                    customer_master.group_code, customer_wise_sales.month;
+            """
+            return self._read_sql(query)
+        return self._cached('client_route_sales', build, refresh)
+
+    def get_top_clients_for_product(self,product, month, limit=None):
+        # limit=None returns every client (needed for Pareto/HHI on the full client base)
+        limit_clause = f"LIMIT {int(limit)}" if limit else ""
+        if month == 'All':
+            query = f"""
                 SELECT 
                     customer_name, 
                     SUM(quantity) AS total_quantity_sold, 
@@ -219,11 +392,11 @@ class MySQLDatabase():
                     customer_name
                 ORDER BY 
                     total_quantity_sold DESC
-                LIMIT 5;
+                {limit_clause};
             """
             params = [product]
         else:
-            query = """
+            query = f"""
                 SELECT 
                     customer_name, 
                     SUM(quantity) AS total_quantity_sold, 
@@ -236,24 +409,33 @@ class MySQLDatabase():
                     customer_name
                 ORDER BY 
                     total_quantity_sold DESC
-                LIMIT 5;
+                {limit_clause};
             """
             params = [product, month]
 
-        df = pd.read_sql(query, self.conn, params=params)
+        df = self._read_sql(query, params=params)
         return df
     
     
 
 
+    def get_product_name_index(self, refresh=False):
+        """NameIndex over item descriptions in sales_per_client, kept in memory (see _cached)."""
+        def build():
+            query = """
+                SELECT DISTINCT item_description
+                FROM sales_per_client
+                ORDER BY item_description;
+            """
+            df = self._read_sql(query)
+            return NameIndex(df['item_description'].tolist())
+        return self._cached('product_name_index', build, refresh)
+
     def get_all_products(self):
-        query = """
-            SELECT DISTINCT item_description
-            FROM sales_per_client
-            ORDER BY item_description;
-        """
-        df = pd.read_sql(query, self.conn)
-        return df['item_description'].tolist()  # Return as a list of product names.
+        return list(self.get_product_name_index().names)  # Return as a list of product names.
+
+    def search_products(self, query, limit=50):
+        return self.get_product_name_index().search(query, limit=limit)
     
     
     # Fetch sales distribution by route for the selected product and month
@@ -297,9 +479,150 @@ class MySQLDatabase():
             """
             params = [product, month]
 
-        df = pd.read_sql(query, self.conn, params=params)
+        df = self._read_sql(query, params=params)
         return df
-    
+
+
+    def get_all_product_monthly_series(self, refresh=False):
+        """
+        Monthly quantity, revenue and reach for every product, computed in one
+        aggregate over sales_per_client and kept in memory (see _cached).
+        Returns a dict {item_description: DataFrame} with columns
+        ['month', 'total_quantity_sold', 'total_sales_amount', 'unique_clients', 'unique_routes']
+        """
+        def build():
+            query = """
+                SELECT
+                    sales_per_client.item_description,
+                    sales_per_client.month,
+                    SUM(sales_per_client.quantity) AS total_quantity_sold,
+                    SUM(sales_per_client.sales_amt) AS total_sales_amount,
+                    COUNT(DISTINCT sales_per_client.customer_code) AS unique_clients,
+                    COUNT(DISTINCT customer_master.route) AS unique_routes
+                FROM
+                    sales_per_client
+                LEFT JOIN
+                    customer_master ON sales_per_client.customer_code = customer_master.bp_code
+                GROUP BY
+                    sales_per_client.item_description, sales_per_client.month;
+            """
+            df = self._read_sql(query)
+            return {
+                product: group.drop(columns='item_description').reset_index(drop=True)
+                for product, group in df.groupby('item_description', sort=False, observed=True)
+            }
+        return self._cached('product_monthly_series', build, refresh)
+
+    def get_product_monthly_series(self, product):
+        """Monthly series for one product, looked up from the bulk aggregate."""
+        series = self.get_all_product_monthly_series().get(product)
+        if series is None:
+            return pd.DataFrame(columns=['month', 'total_quantity_sold', 'total_sales_amount',
+                                         'unique_clients', 'unique_routes'])
+        return series.copy()
+
+
+    # Monthly volume per product across all clients (input for BOM material demand)
+    def get_monthly_product_quantities(self):
+        query = """
+            SELECT
+                month,
+                item_description,
+                SUM(quantity) AS total_quantity_sold,
+                SUM(sales_amt) AS total_sales_amt
+            FROM sales_per_client
+            GROUP BY month, item_description;
+        """
+        df = self._read_sql(query)
+        return df
+
+    # Input for product_stats.compute_concentration_stats (every product, month, client and route)
+    def get_product_client_route_sales(self):
+        query = """
+            SELECT
+                sales_per_client.item_description,
+                sales_per_client.month,
+                sales_per_client.customer_name,
+                customer_master.route,
+                SUM(sales_per_client.quantity) AS quantity,
+                SUM(sales_per_client.sales_amt) AS sales_amt
+            FROM
+                sales_per_client
+            LEFT JOIN
+                customer_master ON sales_per_client.customer_code = customer_master.bp_code
+            GROUP BY
+                sales_per_client.item_description, sales_per_client.month,
+                sales_per_client.customer_name, customer_master.route;
+        """
+        df = self._read_sql(query)
+        return df
+
+    def save_product_concentration_stats(self, stats_df):
+        """Replace the contents of product_concentration_stats in a single transaction."""
+        create_query = """
+            CREATE TABLE IF NOT EXISTS product_concentration_stats (
+                item_description VARCHAR(255) NOT NULL,
+                month VARCHAR(16) NOT NULL,
+                total_quantity DOUBLE,
+                total_revenue DOUBLE,
+                n_clients INT,
+                n_routes INT,
+                client_hhi DOUBLE,
+                clients_to_80 INT,
+                client_at_80 VARCHAR(255),
+                share_at_80 DOUBLE,
+                top5_coverage DOUBLE,
+                top10_coverage DOUBLE,
+                route_hhi DOUBLE,
+                top3_route_share DOUBLE,
+                PRIMARY KEY (item_description, month)
+            );
+        """
+        columns = list(stats_df.columns)
+        insert_query = f"""
+            INSERT INTO product_concentration_stats ({', '.join(columns)})
+            VALUES ({', '.join(['%s'] * len(columns))});
+        """
+        rows = self._rows_for_insert(stats_df)
+
+        self.cursor.execute(create_query)
+        try:
+            self.cursor.execute("DELETE FROM product_concentration_stats;")
+            self.cursor.executemany(insert_query, rows)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        self._forget('product_concentration_stats')
+
+    def _get_product_concentration_stats(self):
+        # (table, {(product, month): row}), kept in memory; None if the batch job (product_stats.py) has not run yet
+        def build():
+            df = self._read_sql("SELECT * FROM product_concentration_stats;")
+            return df, {(r['item_description'], r['month']): r for r in df.to_dict('records')}
+
+        try:
+            return self._cached('product_concentration_stats', build)
+        except Exception as e:
+            print(f"Error: {e}")
+            return None
+
+    def get_product_concentration_stats(self, product, month):
+        """Precomputed concentration stats for one product/month as a dict, or None."""
+        stats = self._get_product_concentration_stats()
+        if stats is None or stats[0].empty:
+            return None
+        return stats[1].get((product, str(month)[:3].title() if month != 'All' else 'All'))
+
+    def get_product_risk_ranking(self, month='All'):
+        """Products ranked by client concentration (highest HHI = most dependent on few clients)."""
+        stats = self._get_product_concentration_stats()
+        if stats is None or stats[0].empty:
+            return pd.DataFrame()
+        df = stats[0]
+        df = df[df['month'] == month]
+        return df.sort_values(['client_hhi', 'top5_coverage'], ascending=False).reset_index(drop=True)
+
     def get_client_product_sales(self, client_name, selected_month=None):
         query = """
             SELECT 
@@ -314,10 +637,10 @@ class MySQLDatabase():
         # If a specific month is selected, filter by that month
         if selected_month and selected_month != 'All':
             query += " AND month = %s GROUP BY customer_name, item_description"
-            df = pd.read_sql(query, self.conn, params=[client_name, selected_month])
+            df = self._read_sql(query, params=[client_name, selected_month])
         else:
             query += " GROUP BY customer_name, item_description"
-            df = pd.read_sql(query, self.conn, params=[client_name])
+            df = self._read_sql(query, params=[client_name])
         
         return df
     
@@ -337,7 +660,7 @@ class MySQLDatabase():
             ORDER BY month
         """
         # Fetch the data and return it as a DataFrame
-        df = pd.read_sql(query, self.conn, params=[client_name])
+        df = self._read_sql(query, params=[client_name])
         
         return df
     
@@ -352,7 +675,7 @@ class MySQLDatabase():
                 GROUP BY item_description
                 ORDER BY total_quantity_sold DESC;
             """
-            df = pd.read_sql(query, self.conn)
+            df = self._read_sql(query)
         else:
             query = """
                 SELECT item_description, SUM(quantity) AS total_quantity_sold 
@@ -363,7 +686,7 @@ class MySQLDatabase():
                 GROUP BY item_description
                 ORDER BY total_quantity_sold DESC;
             """
-            df = pd.read_sql(query, self.conn, params=[selected_month])
+            df = self._read_sql(query, params=[selected_month])
         return df
     
     def get_client_product_sales_detailed(self, client_name):
@@ -382,69 +705,133 @@ class MySQLDatabase():
             GROUP BY 
                 sales_per_client.month, sales_per_client.item_description;
         """
-        df = pd.read_sql(query, self.conn, params=[client_name])
+        df = self._read_sql(query, params=[client_name])
         return df
     
     
     ###### Distributors Page
     # Function to get the top 20 distributors by total sales
     def get_top_20_distributors(self):
-        query = """
-            SELECT customer_master.bp_name AS distributor_name, 
-                SUM(customer_wise_sales.total_ar_invoice) AS total_sales
-            FROM customer_wise_sales
-            JOIN customer_master ON customer_wise_sales.customer_code = customer_master.bp_code
-            WHERE customer_master.group_code = 'DISTRIBUTORS'
-            GROUP BY customer_master.bp_name
-            ORDER BY total_sales DESC
-            LIMIT 20;
-        """
-        df = pd.read_sql(query, self.conn)
-        return df
+        sales = self.get_all_client_route_sales()
+        return top_n.top_totals(sales, 'customer_name', 'total_sold_to_client', 20, group_code='DISTRIBUTORS').rename(
+            columns={'customer_name': 'distributor_name', 'total_sold_to_client': 'total_sales'})
     
     
 
     # Function to get total sales by product for top 20 distributors
-    def get_top_clients_product_sales(self, client_type, percentage):
-    # Step 1: Retrieve all distributors' sales data
-        group_code_condition = "group_code IS NOT NULL" if client_type == "All" else "group_code = %s"
-
-        query_top_clients = f"""
-            SELECT 
-                customer_master.bp_name, 
-                SUM(cws.total_ar_invoice) AS total_sales
-            FROM 
-                customer_wise_sales cws
-            JOIN 
-                customer_master ON cws.customer_code = customer_master.bp_code
-            WHERE 
-                {group_code_condition}
-            GROUP BY 
-                customer_master.bp_name
-            ORDER BY 
-                total_sales DESC
+    def _client_segment_sql(self, client_type, percentage, all_condition="", with_months=False):
         """
-
-        # Fetch the top clients
-        if client_type == "All":
-            df_clients = pd.read_sql(query_top_clients, self.conn)
+        WITH clause ranking the clients of a type by total sales (window functions) and
+        marking the top `percentage` % of them, plus its params. The `ranked_clients` CTE
+        has bp_name, total_sales, [Jan..Sep,] client_rank, n_clients, type_total and selected.
+        The cut is FLOOR(n_clients * percentage / 100), in floating point like int() in Python.
+        """
+        if client_type == 'All':
+            client_condition, params = all_condition, []
         else:
-            df_clients = pd.read_sql(query_top_clients, self.conn, params=[client_type])
-
-        # Step 2: Calculate how many clients to include based on the selected percentage
-        top_clients_limit = int(len(df_clients) * (percentage / 100))
-        top_clients_df = df_clients.head(top_clients_limit)  # Select the top clients
-
-        # Step 3: Use the top clients' data to fetch their product sales
-        top_client_names = top_clients_df['bp_name'].tolist()  # List of top client names
+            client_condition, params = "WHERE customer_master.group_code = %s", [client_type]
+        month_columns = ""
+        if with_months:
+            month_columns = """,
+                    SUM(CASE WHEN cws.month = 'Jan' THEN cws.total_ar_invoice ELSE 0 END) AS Jan,
+                    SUM(CASE WHEN cws.month = 'Feb' THEN cws.total_ar_invoice ELSE 0 END) AS Feb,
+                    SUM(CASE WHEN cws.month = 'March' THEN cws.total_ar_invoice ELSE 0 END) AS Mar,
+                    SUM(CASE WHEN cws.month = 'April' THEN cws.total_ar_invoice ELSE 0 END) AS Apr,
+                    SUM(CASE WHEN cws.month = 'May' THEN cws.total_ar_invoice ELSE 0 END) AS May,
+                    SUM(CASE WHEN cws.month = 'June' THEN cws.total_ar_invoice ELSE 0 END) AS Jun,
+                    SUM(CASE WHEN cws.month = 'July' THEN cws.total_ar_invoice ELSE 0 END) AS Jul,
+                    SUM(CASE WHEN cws.month = 'August' THEN cws.total_ar_invoice ELSE 0 END) AS Aug,
+                    SUM(CASE WHEN cws.month = 'September' THEN cws.total_ar_invoice ELSE 0 END) AS Sep"""
+        query = f"""
+            WITH client_totals AS (
+                SELECT customer_master.bp_name,
+                    SUM(cws.total_ar_invoice) AS total_sales{month_columns}
+                FROM customer_wise_sales cws
+                JOIN customer_master ON cws.customer_code = customer_master.bp_code
+                {client_condition}
+                GROUP BY customer_master.bp_name
+            ),
+            ranked AS (
+                SELECT client_totals.*,
+                    ROW_NUMBER() OVER (ORDER BY total_sales DESC) AS client_rank,
+                    COUNT(*) OVER () AS n_clients,
+                    SUM(total_sales) OVER () AS type_total
+                FROM client_totals
+            ),
+            ranked_clients AS (
+                SELECT ranked.*, client_rank <= FLOOR(n_clients * (%s / 100e0)) AS selected
+                FROM ranked
+            )
+        """
+        return query, params + [percentage]
 
-        # If there are no clients in the result, return an empty DataFrame
-        if not top_client_names:
-            return pd.DataFrame()
+    def get_client_segment(self, client_type, percentage):
+        """
+        Top `percentage` % of the clients of a type by sales, ranked and cut in SQL, with both
+        totals from the same query. Only the selected clients (or one row, for the totals) are sent.
+        Returns (clients DataFrame [client_name, total_sales, Jan..Sep], client type total, overall total);
+        the totals are None when the client type has no sales.
+        """
+        cte, params = self._client_segment_sql(client_type, percentage, with_months=True)
+        query = cte + """
+            SELECT ranked_clients.*,
+                (SELECT SUM(total_ar_invoice) FROM customer_wise_sales) AS overall_total
+            FROM ranked_clients
+            WHERE selected OR client_rank = 1
+            ORDER BY client_rank;
+        """
+        df = self._read_sql(query, params=params)
+        if df.empty:
+            return pd.DataFrame(columns=['client_name', 'total_sales']), None, None
+        type_total, overall_total = df['type_total'].iloc[0], df['overall_total'].iloc[0]
+        clients = df[df['selected'].astype(bool)].drop(
+            columns=['client_rank', 'n_clients', 'type_total', 'selected', 'overall_total'])
+        return clients.rename(columns={'bp_name': 'client_name'}).reset_index(drop=True), type_total, overall_total
+
+    def get_client_segments(self, client_type, refresh=False):
+        """
+        ClientSegments of a client type: its clients in rank order with prefix sums of their
+        sales, and their month x product sales, so every percentage cut is answered from memory.
+        Kept in memory (see _cached); read from the precomputed store when precompute.py has saved
+        it since the last data load, otherwise with two queries. refresh=True always queries.
+        """
+        def build():
+            segments = None if refresh else result_store.load('client_segments', client_type, current=True)
+            if segments is None:
+                cte, params = self._client_segment_sql(client_type, 100, with_months=True)
+                clients = self._read_sql(cte + """
+                    SELECT ranked_clients.*,
+                        (SELECT SUM(total_ar_invoice) FROM customer_wise_sales) AS overall_total
+                    FROM ranked_clients
+                    ORDER BY client_rank;
+                """, params=params)
+
+                # Sales of every code of a client name, as in the ranked_clients joins below
+                client_condition, params = "", []
+                if client_type != 'All':
+                    client_condition = "WHERE cm.bp_name IN (SELECT bp_name FROM customer_master WHERE group_code = %s)"
+                    params = [client_type]
+                product_sales = self._read_sql(f"""
+                    SELECT cm.bp_name,
+                        spc.month,
+                        spc.item_description,
+                        SUM(spc.sales_amt) AS total_sales_amt,
+                        SUM(spc.quantity) AS total_quantity_sold
+                    FROM sales_per_client spc
+                    JOIN customer_master cm ON spc.customer_code = cm.bp_code
+                    {client_condition}
+                    GROUP BY cm.bp_name, spc.month, spc.item_description;
+                """, params=params or None)
+
+                overall_total = clients['overall_total'].iloc[0] if not clients.empty else None
+                segments = ClientSegments(clients, product_sales, overall_total)
+            return segments
+        return self._cached(f'client_segments_{client_type}', build, refresh)
 
-        # Step 4: Dynamically construct the query with placeholders for the `IN` clause
-        placeholders = ', '.join(['%s'] * len(top_client_names))
-        query_product_sales = f"""
+    def get_top_clients_product_sales(self, client_type, percentage):
+        # Top clients are ranked and cut in the same query ('All' = every client with a group_code)
+        cte, params = self._client_segment_sql(client_type, percentage, all_condition="WHERE group_code IS NOT NULL")
+        query = cte + """
             SELECT 
                 spc.month, 
                 spc.item_description, 
@@ -454,78 +841,34 @@ class MySQLDatabase():
                 sales_per_client spc
             JOIN 
                 customer_master cm ON spc.customer_code = cm.bp_code
-            WHERE 
-                cm.bp_name IN ({placeholders})
+            JOIN 
+                ranked_clients ON ranked_clients.bp_name = cm.bp_name AND ranked_clients.selected
             GROUP BY 
                 spc.month, spc.item_description
             ORDER BY 
                 spc.month ASC, total_sales_amt DESC;
         """
-
-        # Execute the query and pass the list of top client names as parameters
-        df_product_sales = pd.read_sql(query_product_sales, self.conn, params=top_client_names)
+        df_product_sales = self._read_sql(query, params=params)
 
         return df_product_sales
 
 
-
-
-    
-    
     def get_monthly_clients_product_sales(self, client_type, percentage):
-    # Step 1: Get the top clients based on the percentage
-        client_condition = ""
-        params = []
-
-        # If the client type is not 'All', add the filtering condition for group_code
-        if client_type != 'All':
-            client_condition = "WHERE customer_master.group_code = %s"
-            params.append(client_type)
-
-        # Step 2: Retrieve all relevant clients
-        query_top_clients = f"""
-            SELECT customer_master.bp_name, 
-                SUM(cws.total_ar_invoice) AS total_sales
-            FROM customer_wise_sales cws
-            JOIN customer_master ON cws.customer_code = customer_master.bp_code
-            {client_condition}
-            GROUP BY customer_master.bp_name
-            ORDER BY total_sales DESC
-        """
-        
-        # Fetch the clients
-        df_clients = pd.read_sql(query_top_clients, self.conn, params=params)
-
-        # Step 3: Calculate the limit based on the selected percentage
-        top_clients_limit = int(len(df_clients) * (percentage / 100))
-        top_clients_df = df_clients.head(top_clients_limit)
-
-        # Step 4: If no clients are found, return an empty DataFrame
-        if top_clients_df.empty:
-            return pd.DataFrame()
-
-        # Step 5: Extract the list of client names
-        top_client_names = top_clients_df['bp_name'].tolist()
-
-        # Step 6: Use the client names in the second query to fetch monthly product sales
-        placeholders = ', '.join(['%s'] * len(top_client_names))
-
-        query_product_sales = f"""
+        # Top clients are ranked and cut in the same query ('All' = every client)
+        cte, params = self._client_segment_sql(client_type, percentage)
+        query = cte + """
             SELECT spc.month, 
                 spc.item_description, 
                 SUM(spc.sales_amt) AS total_sales_amt, 
                 SUM(spc.quantity) AS total_quantity_sold
             FROM sales_per_client spc
             JOIN customer_master cm ON spc.customer_code = cm.bp_code
-            WHERE cm.bp_name IN ({placeholders})
+            JOIN ranked_clients ON ranked_clients.bp_name = cm.bp_name AND ranked_clients.selected
             GROUP BY spc.month, spc.item_description
             ORDER BY spc.month ASC, total_sales_amt DESC;
         """
+        df_product_sales = self._read_sql(query, params=params)
 
-        # Step 7: Execute the query with the top client names as parameters
-        
-        df_product_sales = pd.read_sql(query_product_sales, self.conn, params=top_client_names)
-     
         return df_product_sales
     
     
@@ -543,9 +886,9 @@ class MySQLDatabase():
         """
         
         if client_type == 'All':
-            result = pd.read_sql(query, self.conn)
+            result = self._read_sql(query)
         else:
-            result = pd.read_sql(query, self.conn, params=[client_type])
+            result = self._read_sql(query, params=[client_type])
         
         return result['total_sales'].iloc[0]
     
@@ -555,49 +898,13 @@ class MySQLDatabase():
             SELECT SUM(total_ar_invoice) AS total_sales
             FROM customer_wise_sales;
         """
-        result = pd.read_sql(query, self.conn)
+        result = self._read_sql(query)
         return result['total_sales'].iloc[0]
     
     
     def get_top_clients(self, client_type, percentage):
-    # If client type is 'All', no need to filter by group_code
-        client_condition = ""
-        params = []
-
-        if client_type != 'All':
-            client_condition = "WHERE customer_master.group_code = %s"
-            params.append(client_type)
-
-        # Query to get the total sales for each client based on the selected client type
-        # Query to get the total sales and monthly sales (Jan-Sep) for each client
-        query_top_clients = f"""
-            SELECT customer_master.bp_name AS client_name, 
-                SUM(cws.total_ar_invoice) AS total_sales,
-                SUM(CASE WHEN cws.month = 'Jan' THEN cws.total_ar_invoice ELSE 0 END) AS Jan,
-                SUM(CASE WHEN cws.month = 'Feb' THEN cws.total_ar_invoice ELSE 0 END) AS Feb,
-                SUM(CASE WHEN cws.month = 'March' THEN cws.total_ar_invoice ELSE 0 END) AS Mar,
-                SUM(CASE WHEN cws.month = 'April' THEN cws.total_ar_invoice ELSE 0 END) AS Apr,
-                SUM(CASE WHEN cws.month = 'May' THEN cws.total_ar_invoice ELSE 0 END) AS May,
-                SUM(CASE WHEN cws.month = 'June' THEN cws.total_ar_invoice ELSE 0 END) AS Jun,
-                SUM(CASE WHEN cws.month = 'July' THEN cws.total_ar_invoice ELSE 0 END) AS Jul,
-                SUM(CASE WHEN cws.month = 'August' THEN cws.total_ar_invoice ELSE 0 END) AS Aug,
-                SUM(CASE WHEN cws.month = 'September' THEN cws.total_ar_invoice ELSE 0 END) AS Sep
-            FROM customer_wise_sales cws
-            JOIN customer_master ON cws.customer_code = customer_master.bp_code
-            {client_condition}
-            GROUP BY customer_master.bp_name
-            ORDER BY total_sales DESC
-    """
-
-
-        # Fetch the top clients
-        df_clients = pd.read_sql(query_top_clients, self.conn, params=params)
-
-        # Calculate the number of top clients to select based on the percentage
-        top_clients_limit = int(len(df_clients) * (percentage / 100))
-        
-        # Return the top percentage of clients
-        return df_clients.head(top_clients_limit)
+        # Total and monthly (Jan-Sep) sales of the top percentage of clients, cut in SQL
+        return self.get_client_segment(client_type, percentage)[0]
 
 
 #### Distributors ####
@@ -620,7 +927,7 @@ class MySQLDatabase():
                 GROUP BY spc.item_description
                 ORDER BY total_sales_amt DESC;
             """
-            df = pd.read_sql(query, self.conn)
+            df = self._read_sql(query)
             return df
 
     # Function to get monthly product sales for top 20 distributors
@@ -643,7 +950,7 @@ class MySQLDatabase():
             GROUP BY spc.month, spc.item_description
             ORDER BY spc.month ASC, total_sales_amt DESC;
         """
-        df = pd.read_sql(query, self.conn)
+        df = self._read_sql(query)
         return df
 
 
@@ -654,7 +961,7 @@ class MySQLDatabase():
             JOIN customer_master ON customer_wise_sales.customer_code = customer_master.bp_code
             WHERE customer_master.group_code = 'DISTRIBUTORS';
         """
-        result = pd.read_sql(query, self.conn)
+        result = self._read_sql(query)
         return result['total_distributor_sales'].iloc[0]
 
     def get_total_overall_sales(self):
@@ -662,7 +969,7 @@ class MySQLDatabase():
             SELECT SUM(total_ar_invoice) AS total_sales
             FROM customer_wise_sales;
         """
-        result = pd.read_sql(query, self.conn)
+        result = self._read_sql(query)
         return result['total_sales'].iloc[0]
     
     
@@ -701,7 +1008,7 @@ class MySQLDatabase():
             LIMIT 5
         """
 
-        df = pd.read_sql(query, self.conn, params=params)
+        df = self._read_sql(query, params=params)
         return df
 
 
@@ -736,7 +1043,7 @@ class MySQLDatabase():
             ORDER BY total_sales DESC
         """
 
-        df = pd.read_sql(query, self.conn, params=params)
+        df = self._read_sql(query, params=params)
         
         # Add ranking based on total sales
         df['rank'] = df['total_sales'].rank(ascending=False)
@@ -768,7 +1075,7 @@ class MySQLDatabase():
             ORDER BY FIELD(customer_wise_sales.month, 'Jan', 'Feb', 'March', 'April', 'May', 'June', 'July', 'August', 'September')
         """
         
-        df = pd.read_sql(query, self.conn, params=params)
+        df = self._read_sql(query, params=params)
         return df
 
 
@@ -795,10 +1102,10 @@ class MySQLDatabase():
 
         # Execute the query with the product and the list of valid sales managers
         params = [product] + valid_sales_managers
-        df = pd.read_sql(query, self.conn, params=params)
+        df = self._read_sql(query, params=params)
 
         # `rank`sales managers within each month based on sales amount
-        df['rank'] = df.groupby('month')['total_sales_amt'].rank(ascending=False)
+        df['rank'] = df.groupby('month', observed=True)['total_sales_amt'].rank(ascending=False)
 
         return df
 
@@ -807,35 +1114,14 @@ class MySQLDatabase():
     def get_top_5_clients_by_manager(self, sales_manager, month):
         valid_sales_managers = ["George Omondi", "Joshua Ageta", "Kennedy Mutisya", "Jarso Abdi", 
                                 "Nicholas Dass", "Nicholas Baraka", "Mourice Kevin Barasa"]
+        if sales_manager not in valid_sales_managers:
+            return pd.DataFrame(columns=['client_name', 'total_sales'])
 
-        query = f"""
-            SELECT cm.bp_name AS client_name, 
-                SUM(cws.total_ar_invoice) AS total_sales
-            FROM customer_wise_sales cws
-            JOIN customer_master cm ON cws.customer_code = cm.bp_code
-            WHERE cm.sales_manager = %s
-            AND cm.sales_manager IN ({', '.join(['%s'] * len(valid_sales_managers))})
-        """
-        
-        # If a specific month is selected
-        if month != 'All':
-            query += " AND cws.month = %s"
-
-        query += """
-            GROUP BY cm.bp_name
-            ORDER BY total_sales DESC
-            LIMIT 5
-        """
-        
-        # Preparing the params based on the selected month
-        params = [sales_manager] + valid_sales_managers
-        if month != 'All':
-            params.append(month)
-        
-        # Fetching the data from the database
-        df = pd.read_sql(query, self.conn, params=params)
-        
-        return df
+        # Top 5 by partial selection over the in-memory client aggregate
+        sales = self.get_all_client_route_sales()
+        return top_n.top_totals(sales, 'customer_name', 'total_sold_to_client', 5, sales_manager=sales_manager,
+                                month=None if month == 'All' else month).rename(
+            columns={'customer_name': 'client_name', 'total_sold_to_client': 'total_sales'})
 
 
 
@@ -858,7 +1144,7 @@ class MySQLDatabase():
             ORDER BY FIELD(customer_wise_sales.month, 'Jan', 'Feb', 'March', 'April', 'May', 'June', 'July', 'August', 'September')
         """
 
-        df = pd.read_sql(query, self.conn, params=params)
+        df = self._read_sql(query, params=params)
 
         # Fill missing months with zero sales
         all_months = pd.DataFrame({'month': ['Jan', 'Feb', 'March', 'April', 'May', 'June', 'July', 'August', 'September']})
@@ -886,7 +1172,7 @@ class MySQLDatabase():
             ORDER BY FIELD(customer_wise_sales.month, 'Jan', 'Feb', 'March', 'April', 'May', 'June', 'July', 'August', 'September')
         """
 
-        df = pd.read_sql(query, self.conn, params=params)
+        df = self._read_sql(query, params=params)
         
         # Fill missing months with zero median sales
         all_months = pd.DataFrame({'month': ['Jan', 'Feb', 'March', 'April', 'May', 'June', 'July', 'August', 'September']})
@@ -920,7 +1206,7 @@ class MySQLDatabase():
             LIMIT 5
         """
 
-        df = pd.read_sql(query, self.conn, params=params)
+        df = self._read_sql(query, params=params)
         return df
 
 
@@ -959,6 +1245,67 @@ class MySQLDatabase():
             ORDER BY FIELD(customer_wise_sales.month, 'January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September')
         """
         
-        df = pd.read_sql(query, self.conn, params=params)
+        df = self._read_sql(query, params=params)
         return df
 
+
+
+    #### BOM ####
+
+    @staticmethod
+    def _rows_for_insert(df):
+        return [tuple(None if pd.isna(v) else v for v in row)
+                for row in df.astype(object).itertuples(index=False, name=None)]
+
+    def _insert_batches(self, table, columns, rows, batch_size, update_columns=None):
+        """Multi-row INSERT in batches; upserts `update_columns` on duplicate keys."""
+        row_placeholder = f"({', '.join(['%s'] * len(columns))})"
+        on_duplicate = ""
+        if update_columns:
+            on_duplicate = " ON DUPLICATE KEY UPDATE " + ", ".join(f"{c} = VALUES({c})" for c in update_columns)
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            query = (f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+                     + ", ".join([row_placeholder] * len(batch)) + on_duplicate)
+            self.cursor.execute(query, [v for row in batch for v in row])
+
+    def bulk_load_bom(self, products_df, bom_components_df, bill_of_materials_df, batch_size=1000):
+        """
+        Load the three split BOM tables in one transaction.
+        products / bom_components are upserted on item_code; the bill_of_materials lines
+        of every finished good in the upload replace the ones already stored.
+        Returns a dict of row counts per table.
+        """
+        # Prepare all rows before opening the transaction so locks are held only while writing
+        products_df = products_df.drop_duplicates('item_code', keep='last')
+        bom_components_df = bom_components_df.drop_duplicates('item_code', keep='last')
+        product_rows = self._rows_for_insert(products_df)
+        component_rows = self._rows_for_insert(bom_components_df)
+        bom_rows = self._rows_for_insert(bill_of_materials_df)
+        finished_goods = bill_of_materials_df['finished_good_code'].dropna().astype(str).unique().tolist()
+
+        try:
+            if not self.conn.in_transaction:
+                self.conn.start_transaction()
+            self._insert_batches('products', list(products_df.columns), product_rows, batch_size,
+                                 update_columns=[c for c in products_df.columns if c != 'item_code'])
+            self._insert_batches('bom_components', list(bom_components_df.columns), component_rows, batch_size,
+                                 update_columns=[c for c in bom_components_df.columns if c != 'item_code'])
+            for start in range(0, len(finished_goods), batch_size):
+                batch = finished_goods[start:start + batch_size]
+                self.cursor.execute(
+                    f"DELETE FROM bill_of_materials WHERE finished_good_code IN ({', '.join(['%s'] * len(batch))})",
+                    batch
+                )
+            self._insert_batches('bill_of_materials', list(bill_of_materials_df.columns), bom_rows, batch_size)
+            self.conn.commit()
+        except Exception:
+            # Not only MySQL errors: bad cell values fail in the driver (TypeError, ValueError, ...)
+            self.conn.rollback()
+            raise
+
+        return {
+            'products': len(product_rows),
+            'bom_components': len(component_rows),
+            'bill_of_materials': len(bom_rows),
+        }
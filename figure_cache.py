@@ -0,0 +1,82 @@
+"""
+Process-wide cache of serialized Plotly figures.
+
+Pages wrap figure construction in a builder function and call
+cached_figure(builder, *data, **options). The key is a hash of the builder,
+the input data and the options; on a hit the stored figure JSON is wrapped
+in a Figure as is, without running plotly.express / graph_objects
+construction or property validation again. Moving an unrelated widget
+therefore no longer rebuilds every chart.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+import tracing
+
+
+_MAX_FIGURES = 256
+_figures = OrderedDict()  # key -> figure JSON
+_lock = threading.Lock()
+
+
+def _update_hash(h, value):
+    if isinstance(value, pd.DataFrame):
+        h.update(repr((list(value.columns), [str(t) for t in value.dtypes])).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        h.update(repr((value.name, str(value.dtype))).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, (list, tuple)):
+        h.update(b'[')
+        for item in value:
+            _update_hash(h, item)
+        h.update(b']')
+    elif isinstance(value, dict):
+        for k in sorted(value, key=repr):
+            h.update(repr(k).encode())
+            _update_hash(h, value[k])
+    else:
+        h.update(repr(value).encode())
+
+
+def data_key(*data, **options):
+    """Content hash of frames / series / plain values, usable as a cache key."""
+    h = hashlib.sha1()
+    _update_hash(h, data)
+    _update_hash(h, options)
+    return h.hexdigest()
+
+
+def figure_key(builder, *data, **options):
+    return data_key(f"{builder.__module__}.{builder.__qualname__}", *data, **options)
+
+
+def cached_figure(builder, *data, **options):
+    """builder(*data, **options) -> plotly Figure, served from the JSON cache when inputs are unchanged."""
+    with tracing.span('chart', builder.__name__):
+        key = figure_key(builder, *data, **options)
+        with _lock:
+            fig_json = _figures.get(key)
+            if fig_json is not None:
+                _figures.move_to_end(key)
+        if fig_json is not None:
+            # The spec was produced by Plotly itself: skip re-validating every property
+            return go.Figure(json.loads(fig_json), _validate=False)
+
+        fig = builder(*data, **options)
+        with _lock:
+            _figures[key] = pio.to_json(fig, validate=False)
+            while len(_figures) > _MAX_FIGURES:
+                _figures.popitem(last=False)
+        return fig
+
+
+def clear_figure_cache():
+    with _lock:
+        _figures.clear()
@@ -2,6 +2,10 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 from conn1 import MySQLDatabase
+from figure_cache import cached_figure
+from charts import line_traces
+from widgets import latency_panel
+import tracing
 import pandas as pd
 import numpy as np
 
@@ -10,6 +14,7 @@ import numpy as np
 # =========================
 st.set_page_config(page_title="Sales Dashboard + Forecast", layout="wide")
 st.title("📊 Sales Dashboard")
+tracing.begin_page("Dashboard")
 
 db = MySQLDatabase()
 db.connect()
@@ -34,24 +39,29 @@ month_map = {m: i+1 for i, m in enumerate(month_order)}
 overall_sales_df = db.get_overall_sales_per_month()
 
 # Ensure month ordering, numeric types
-overall_sales_df['month'] = pd.Categorical(overall_sales_df['month'], categories=month_order, ordered=True)
-overall_sales_df['month_num'] = overall_sales_df['month'].map(month_map)
-overall_sales_df['total_sales'] = pd.to_numeric(overall_sales_df['total_sales'], errors='coerce')
-
-overall_sales_df = overall_sales_df.dropna(subset=['month', 'month_num', 'total_sales']).sort_values('month_num')
-
-fig_trend = px.line(
-    overall_sales_df,
-    x="month",
-    y="total_sales",
-    title="Overall Sales",
-    markers=True
-)
-fig_trend.update_layout(
-    xaxis_title="Month",
-    yaxis_title="Total Sales",
-    hovermode="x unified"
-)
+with tracing.span('transform', 'overall_sales'):
+    overall_sales_df['month'] = pd.Categorical(overall_sales_df['month'], categories=month_order, ordered=True)
+    overall_sales_df['month_num'] = overall_sales_df['month'].map(month_map)
+    overall_sales_df['total_sales'] = pd.to_numeric(overall_sales_df['total_sales'], errors='coerce')
+
+    overall_sales_df = overall_sales_df.dropna(subset=['month', 'month_num', 'total_sales']).sort_values('month_num')
+
+def build_overall_trend(df: pd.DataFrame):
+    fig = px.line(
+        df,
+        x="month",
+        y="total_sales",
+        title="Overall Sales",
+        markers=True
+    )
+    fig.update_layout(
+        xaxis_title="Month",
+        yaxis_title="Total Sales",
+        hovermode="x unified"
+    )
+    return fig
+
+fig_trend = cached_figure(build_overall_trend, overall_sales_df)
 st.plotly_chart(fig_trend, use_container_width=True)
 
 # =========================
@@ -72,13 +82,14 @@ else:
         from prophet import Prophet
 
         # Model with yearly seasonality over months
-        model = Prophet(yearly_seasonality=False, weekly_seasonality=False, daily_seasonality=False)
-        model.add_seasonality(name='yearly', period=12, fourier_order=3)
-        model.fit(df_prophet)
+        with tracing.span('transform', 'prophet_forecast'):
+            model = Prophet(yearly_seasonality=False, weekly_seasonality=False, daily_seasonality=False)
+            model.add_seasonality(name='yearly', period=12, fourier_order=3)
+            model.fit(df_prophet)
 
-        # Forecast N months ahead (month start freq)
-        future = model.make_future_dataframe(periods=forecast_horizon, freq='MS')
-        forecast = model.predict(future)
+            # Forecast N months ahead (month start freq)
+            future = model.make_future_dataframe(periods=forecast_horizon, freq='MS')
+            forecast = model.predict(future)
 
         # Split actual vs forecast by last actual ds
         last_actual_ds = df_prophet['ds'].max()
@@ -160,18 +171,9 @@ top_customers_sales_df = db.get_top_customers_sales_per_month()  # expects: cust
 top_customers_sales_df['month'] = pd.Categorical(top_customers_sales_df['month'], categories=month_order, ordered=True)
 top_customers_sales_df = top_customers_sales_df.sort_values('month')
 
-def plot_customers_sales_per_month(df: pd.DataFrame):
-    fig = go.Figure()
-    for customer in df['customer_name'].unique():
-        sub = df[df['customer_name'] == customer]
-        fig.add_trace(go.Scatter(
-            x=sub['month'],
-            y=sub['total_sales'],
-            mode='lines+markers',
-            name=customer,
-            hovertemplate='Customer: %{text}<br>Month: %{x}<br>Sales: %{y}',
-            text=sub['customer_name']
-        ))
+def build_customers_sales_per_month(df: pd.DataFrame):
+    fig = go.Figure(line_traces(df, 'customer_name', 'month', 'total_sales',
+                                hovertemplate='Customer: {name}<br>Month: %{x}<br>Sales: %{y}'))
     fig.update_layout(
         title='Top 5 Customers Sales by Month',
         xaxis_title='Month',
@@ -182,52 +184,51 @@ def plot_customers_sales_per_month(df: pd.DataFrame):
         legend=dict(x=1, y=1, traceorder='normal')
     )
     fig.update_xaxes(tickangle=-45)
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
-plot_customers_sales_per_month(top_customers_sales_df)
+fig_top_customers = cached_figure(build_customers_sales_per_month, top_customers_sales_df)
+st.plotly_chart(fig_top_customers, use_container_width=True)
 
 
 
 # =========================
-# (Optional) Customer Impact on Route Sales
+# Customer Impact on Route Sales
 # =========================
-# If you want this back, uncomment the lines below and ensure your DB method returns:
-# customer_name, route, month, total_sales
-#
-# st.header("Customer Impact on Route Sales by Month")
-# customer_route_sales_df = db.get_customer_sales_per_route()
-# customer_route_sales_df['month'] = pd.Categorical(customer_route_sales_df['month'], categories=month_order, ordered=True)
-# customer_route_sales_df = customer_route_sales_df.sort_values('month')
-#
-# def plot_customer_impact_on_route_sales(df: pd.DataFrame):
-#     fig = go.Figure()
-#     for route in df['route'].unique():
-#         route_data = df[df['route'] == route]
-#         for customer in route_data['customer_name'].unique():
-#             sub = route_data[route_data['customer_name'] == customer]
-#             fig.add_trace(go.Scatter(
-#                 x=sub['month'],
-#                 y=sub['total_sales'],
-#                 mode='lines+markers',
-#                 name=f"{customer} ({route})",
-#                 hovertemplate='Customer: %{text}<br>Route: {route}<br>Month: %{x}<br>Sales: %{y}',
-#                 text=sub['customer_name']
-#             ))
-#     fig.update_layout(
-#         title='Customer Impact on Route Sales by Month',
-#         xaxis_title='Month',
-#         yaxis_title='Total Sales',
-#         legend_title='Customer (Route)',
-#         hovermode='x unified',
-#         margin=dict(l=0, r=0, t=30, b=30),
-#         legend=dict(x=1, y=1, traceorder='normal')
-#     )
-#     fig.update_xaxes(tickangle=-45)
-#     st.plotly_chart(fig, use_container_width=True)
-#
-# plot_customer_impact_on_route_sales(customer_route_sales_df)
+st.header("Customer Impact on Route Sales by Month")
+
+# Top 5 customers of every route, ranked in SQL and kept in memory after the first load
+customer_route_sales_df = db.get_customer_sales_per_route()
+routes = sorted(customer_route_sales_df['route'].dropna().astype(str).unique())
+
+if not routes:
+    st.info("No route sales recorded.")
+else:
+    selected_route = st.selectbox("Select a Route", routes)
+    route_df = customer_route_sales_df[customer_route_sales_df['route'] == selected_route].copy()
+    route_df['month'] = pd.Categorical(route_df['month'], categories=month_order, ordered=True)
+    route_df = route_df.sort_values(['rankk', 'month'])
+
+    def build_customer_impact_on_route(df: pd.DataFrame, route: str):
+        fig = go.Figure(line_traces(df, 'customer_name', 'month', 'total_sales',
+                                    hovertemplate=f'Customer: {{name}}<br>Route: {route}<br>Month: %{{x}}<br>Sales: %{{y}}'))
+        fig.update_layout(
+            title=f'Top Customers on {route} by Month',
+            xaxis_title='Month',
+            yaxis_title='Total Sales',
+            legend_title='Customer',
+            hovermode='x unified',
+            margin=dict(l=0, r=0, t=30, b=30),
+            legend=dict(x=1, y=1, traceorder='normal')
+        )
+        fig.update_xaxes(tickangle=-45)
+        return fig
+
+    fig_route_impact = cached_figure(build_customer_impact_on_route, route_df, route=selected_route)
+    st.plotly_chart(fig_route_impact, use_container_width=True)
 
 # =========================
 # Cleanup
 # =========================
 db.close()
+latency_panel("Dashboard")
+
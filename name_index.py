@@ -0,0 +1,106 @@
+"""
+In-memory search index over customer and product names.
+
+Names are kept in a sorted, lower-cased array so a prefix lookup is two
+binary searches; every word of every name is indexed the same way so a
+query also matches names that contain a word starting with it ("mombasa"
+finds "Ali Traders Mombasa"). When neither finds enough, a fuzzy pass
+(difflib) catches typos. Codes (bp_code) can be searched as well.
+"""
+import bisect
+import difflib
+import re
+
+
+_TOKEN = re.compile(r"[0-9a-z]+")
+
+
+def _tokens(text):
+    return _TOKEN.findall(text.lower())
+
+
+def _prefix_range(keys, prefix):
+    """[lo, hi) of the sorted `keys` that start with `prefix`."""
+    lo = bisect.bisect_left(keys, prefix)
+    hi = bisect.bisect_left(keys, prefix + '\uffff')
+    return lo, hi
+
+
+class NameIndex():
+    def __init__(self, names, codes=None):
+        """names: iterable of display names; codes: optional matching iterable of codes."""
+        codes = list(codes) if codes is not None else [None] * len(names)
+        entries = {}
+        for name, code in zip(names, codes):
+            if name is None:
+                continue
+            name = str(name)
+            entries.setdefault(name, None if code is None else str(code))
+
+        self.names = sorted(entries, key=str.lower)
+        self.codes = entries
+        self._by_code = {code: name for name, code in entries.items() if code is not None}
+
+        # (key, position in self.names) arrays, sorted by key for prefix lookups
+        self._name_keys = [name.lower() for name in self.names]
+        token_pairs = sorted(
+            {(token, pos) for pos, name in enumerate(self.names) for token in _tokens(name)}
+        )
+        self._token_keys = [token for token, _ in token_pairs]
+        self._token_pos = [pos for _, pos in token_pairs]
+        position = {name: pos for pos, name in enumerate(self.names)}
+        code_pairs = sorted((code.lower(), position[name]) for code, name in self._by_code.items())
+        self._code_keys = [code for code, _ in code_pairs]
+        self._code_pos = [pos for _, pos in code_pairs]
+
+    def __len__(self):
+        return len(self.names)
+
+    def code_for(self, name):
+        return self.codes.get(name)
+
+    def name_for(self, code):
+        return self._by_code.get(str(code))
+
+    def search(self, query, limit=50, fuzzy_cutoff=0.6):
+        """
+        Names matching `query`, best first: full-name prefix, then word prefix (all query
+        words must match), then code prefix, then fuzzy matches if fewer than `limit` found.
+        An empty query returns the first `limit` names alphabetically.
+        """
+        query = (query or '').strip().lower()
+        if not query:
+            return self.names[:limit]
+
+        found = []
+        seen = set()
+
+        def add(positions):
+            for pos in positions:
+                if pos not in seen:
+                    seen.add(pos)
+                    found.append(pos)
+
+        lo, hi = _prefix_range(self._name_keys, query)
+        add(range(lo, min(hi, lo + limit)))
+
+        words = _tokens(query)
+        if words and len(found) < limit:
+            matches = None
+            for word in words:
+                lo, hi = _prefix_range(self._token_keys, word)
+                positions = set(self._token_pos[lo:hi])
+                matches = positions if matches is None else matches & positions
+                if not matches:
+                    break
+            add(sorted(matches or ()))
+
+        if len(found) < limit:
+            lo, hi = _prefix_range(self._code_keys, query)
+            add(sorted(self._code_pos[lo:hi]))
+
+        if len(found) < limit and fuzzy_cutoff:
+            close = difflib.get_close_matches(query, self._name_keys, n=limit - len(found), cutoff=fuzzy_cutoff)
+            add(bisect.bisect_left(self._name_keys, key) for key in close)
+
+        return [self.names[pos] for pos in found[:limit]]
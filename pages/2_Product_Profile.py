@@ -4,16 +4,23 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from conn1 import MySQLDatabase
+from figure_cache import cached_figure
+from categories import compact
+from widgets import search_select, latency_panel
+import tracing
+import result_store
 
 # ---------- Page / Sidebar ----------
 st.set_page_config(page_title="📦 Product Profile", layout="wide")
 st.sidebar.title("Product Profile")
+tracing.begin_page("Product Profile")
 
 db = MySQLDatabase()
 db.connect()
 
-products = db.get_all_products()  # expects iterable of product names/ids
-selected_product = st.sidebar.selectbox("Select a Product", products)
+selected_product = search_select("Select a Product", db.get_product_name_index(), key='selected_product')
+if not selected_product:
+    st.stop()
 
 # Standardize months; allow All
 month_order = ['All','Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
@@ -52,17 +59,122 @@ def concentration_hhi(series_counts: pd.Series) -> float:
 def pct(n, d):
     return 0 if d == 0 else (n/d*100)
 
+# ---------- Chart builders (served through figure_cache) ----------
+def build_pareto(tc_display, total_qty_all, clients_to_80, eighty_client, eighty_share):
+    fig = go.Figure()
+
+    # Bars: Qty
+    fig.add_bar(
+        x=tc_display['Client'],
+        y=tc_display['Qty'],
+        name='Qty'
+    )
+
+    # Line: Cum Share % relative to ALL total
+    tc_display = tc_display.copy()
+    tc_display['CumQty_all_ref'] = tc_display['Qty'].cumsum()
+    tc_display['CumShare%_all_ref'] = np.where(total_qty_all > 0, tc_display['CumQty_all_ref']/total_qty_all*100, 0)
+
+    fig.add_trace(go.Scatter(
+        x=tc_display['Client'],
+        y=tc_display['CumShare%_all_ref'],
+        mode='lines+markers',
+        name='Cum Share %',
+        yaxis='y2'
+    ))
+
+    # 80% horizontal benchmark
+    fig.add_shape(
+        type="line",
+        x0=-0.5, x1=len(tc_display)-0.5,
+        y0=80, y1=80,
+        line=dict(width=2, dash="dash", color="red"),
+        yref="y2"
+    )
+    fig.add_annotation(
+        x=max(0, len(tc_display)//2),
+        y=82,
+        text="80% Pareto Threshold",
+        showarrow=False,
+        font=dict(color="red", size=12),
+        yref="y2"
+    )
+
+    # Highlight crossing point if it falls within the displayed subset
+    if clients_to_80:
+        crossing_client = eighty_client
+        if crossing_client in list(tc_display['Client']):
+            crossing_y = eighty_share
+            fig.add_trace(go.Scatter(
+                x=[crossing_client],
+                y=[crossing_y],
+                mode='markers+text',
+                name='80% Crossing',
+                yaxis='y2',
+                marker=dict(size=12, symbol='diamond'),
+                text=[f"{clients_to_80} clients"],
+                textposition='top center',
+                hovertemplate="Client: %{x}<br>Cum Share: %{y:.1f}%<extra>80% crossing</extra>"
+            ))
+
+    fig.update_layout(
+        title="Pareto — Cumulative Share of Quantity (Top Clients)",
+        xaxis=dict(title=None, tickangle=-30),
+        yaxis=dict(title='Qty'),
+        yaxis2=dict(title='Cum Share %', overlaying='y', side='right', range=[0, 100]),
+        legend=dict(x=0.02, y=0.98, bordercolor="Black", borderwidth=1)
+    )
+    return fig
+
+def build_route_bar(route_distribution_df):
+    r_sorted = route_distribution_df.sort_values('total_quantity_sold', ascending=False).rename(
+        columns={'route':'Route','total_quantity_sold':'Qty'}
+    )
+    fig = px.bar(r_sorted.head(10), x='Route', y='Qty', title="Top 10 Routes by Quantity", text='Qty')
+    fig.update_layout(xaxis_title=None, yaxis_title="Qty", xaxis_tickangle=-30, showlegend=False)
+    return fig
+
+def build_route_pie(grouped_route_df):
+    return px.pie(grouped_route_df.rename(columns={'route':'Route','total_quantity_sold':'Qty'}),
+                  values='Qty', names='Route', title="Sales Distribution by Route (Grouped)")
+
+def build_route_treemap(grouped_route_df):
+    return px.treemap(compact(grouped_route_df).rename(columns={'route':'Route','total_quantity_sold':'Qty'}),
+                      path=['Route'], values='Qty',
+                      title="Treemap — Route Contribution")
+
+def build_trend_line(monthly_df, value_col, title, yaxis_title):
+    fig = px.line(monthly_df, x='month', y=value_col, markers=True, title=title)
+    fig.update_layout(xaxis_title="Month", yaxis_title=yaxis_title)
+    return fig
+
+def build_reach_bars(monthly_df, meta_cols):
+    return px.bar(monthly_df, x='month', y=meta_cols, barmode='group',
+                  title="Monthly Reach — Unique Clients & Routes")
+
 # ---------- Main ----------
 if selected_product:
     st.title(f"📦 {selected_product} — Product Profile")
     sublabel = "All Months" if selected_month == "All" else selected_month
     st.caption(f"View: **{sublabel}**")
 
-    # --- Data pulls (expected columns noted below)
-    top_clients_df = db.get_top_clients_for_product(selected_product, selected_month)
+    # --- Precomputed concentration stats (product_stats.py batch job); None if not available
+    conc_stats = db.get_product_concentration_stats(selected_product, selected_month)
+
+    # --- Data pulls (expected columns noted below); precompute.py results are read first
+    # With precomputed stats only the displayed clients are needed; otherwise fetch ALL clients
+    top_clients_df = result_store.load('product_top_clients', selected_product, selected_month, current=True)
+    if top_clients_df is None:
+        top_clients_df = db.get_top_clients_for_product(selected_product, selected_month,
+                                                        limit=max_clients if conc_stats else None)
+    elif conc_stats:
+        top_clients_df = top_clients_df.head(max_clients)
     # expected: ['customer_name','total_quantity_sold', optional 'total_sales_amount']
 
-    route_distribution_df = db.get_sales_distribution_by_route(selected_product, selected_month)
+    route_distribution_df = result_store.stored(
+        'product_route_distribution',
+        lambda: db.get_sales_distribution_by_route(selected_product, selected_month),
+        selected_product, selected_month)
     # expected: ['route','total_quantity_sold', optional 'total_sales_amount']
 
     # Optional: monthly series for trend (if available)
@@ -72,10 +184,11 @@ if selected_product:
         # expected: ['month','total_quantity_sold', optional 'total_sales_amount', 'unique_clients', 'unique_routes']
         month_cat = pd.CategoricalDtype(categories=month_order[1:], ordered=True)
         if 'month' in monthly_df.columns:
-            monthly_df['month'] = monthly_df['month'].astype(str).str[:3].str.title().replace({'Sept':'Sep'})
-            monthly_df = monthly_df[monthly_df['month'].isin(month_order[1:])].copy()
-            monthly_df['month'] = monthly_df['month'].astype(month_cat)
-            monthly_df = monthly_df.sort_values('month')
+            with tracing.span('transform', 'monthly_series'):
+                monthly_df['month'] = monthly_df['month'].astype(str).str[:3].str.title().replace({'Sept':'Sep'})
+                monthly_df = monthly_df[monthly_df['month'].isin(month_order[1:])].copy()
+                monthly_df['month'] = monthly_df['month'].astype(month_cat)
+                monthly_df = monthly_df.sort_values('month')
     except Exception:
         pass
 
@@ -97,28 +210,38 @@ if selected_product:
     kpi_cols[1].metric("Total Revenue", f"{total_rev:,.0f}" if total_rev is not None else "—")
     kpi_cols[2].metric("Avg Unit Price", f"{avg_price:,.2f}" if avg_price else "—")
     unique_clients = len(top_clients_df['customer_name'].unique()) if (not top_clients_df.empty and 'customer_name' in top_clients_df.columns) else 0
+    if conc_stats:
+        unique_clients = int(conc_stats['n_clients'])
     unique_routes = len(route_distribution_df['route'].unique()) if (not route_distribution_df.empty and 'route' in route_distribution_df.columns) else 0
     kpi_cols[3].metric("Active Clients", f"{unique_clients}")
     kpi_cols[4].metric("Active Routes", f"{unique_routes}")
 
     # ---------- Top Clients + Pareto (ALL clients used for 80% calculation) ----------
     if not top_clients_df.empty:
-        # Sort & normalize
-        tc_all = top_clients_df.copy().rename(columns={'customer_name':'Client', 'total_quantity_sold':'Qty'})
-        if 'total_sales_amount' in tc_all.columns:
-            tc_all = tc_all.rename(columns={'total_sales_amount':'Revenue'})
-        else:
-            tc_all['Revenue'] = pd.NA
+        with tracing.span('transform', 'pareto'):
+            # Sort & normalize
+            tc_all = top_clients_df.copy().rename(columns={'customer_name':'Client', 'total_quantity_sold':'Qty'})
+            if 'total_sales_amount' in tc_all.columns:
+                tc_all = tc_all.rename(columns={'total_sales_amount':'Revenue'})
+            else:
+                tc_all['Revenue'] = pd.NA
 
-        tc_all = tc_all.sort_values('Qty', ascending=False).reset_index(drop=True)
-        total_qty_all = tc_all['Qty'].sum()
+            tc_all = tc_all.sort_values('Qty', ascending=False).reset_index(drop=True)
+            total_qty_all = float(conc_stats['total_quantity']) if conc_stats else tc_all['Qty'].sum()
 
-        # Cumulative share on ALL clients
-        tc_all['CumQty'] = tc_all['Qty'].cumsum()
-        tc_all['CumShare%'] = np.where(total_qty_all > 0, tc_all['CumQty'] / total_qty_all * 100, 0)
+            # Cumulative share on ALL clients
+            tc_all['CumQty'] = tc_all['Qty'].cumsum()
+            tc_all['CumShare%'] = np.where(total_qty_all > 0, tc_all['CumQty'] / total_qty_all * 100, 0)
 
         # Number of clients to reach 80%
-        if (tc_all['CumShare%'] >= 80).any():
+        if conc_stats:
+            if pd.notna(conc_stats['clients_to_80']):
+                clients_to_80 = int(conc_stats['clients_to_80'])
+                eighty_client = conc_stats['client_at_80']
+                eighty_share = float(conc_stats['share_at_80'])
+            else:
+                clients_to_80, eighty_client, eighty_share = None, None, None
+        elif (tc_all['CumShare%'] >= 80).any():
             eighty_idx_all = int((tc_all['CumShare%'] >= 80).idxmax())
             clients_to_80 = eighty_idx_all + 1
             eighty_client = tc_all.loc[eighty_idx_all, 'Client']
@@ -140,86 +263,28 @@ if selected_product:
         with c1:
             st.subheader(f"Top Clients — {selected_product} ({sublabel})")
             st.dataframe(
-                tc_display[['Client','Qty','Revenue','CumShare%']].style.format(
+                compact(tc_display[['Client','Qty','Revenue','CumShare%']]).style.format(
                     {'Qty':'{:,.0f}','Revenue':'{:,.0f}','CumShare%':'{:,.1f}'}
                 ),
                 use_container_width=True
             )
             # Coverage quick stats (using ALL clients)
-            top5_cov = (tc_all['Qty'].head(5).sum() / total_qty_all * 100) if total_qty_all else 0
-            top10_cov = (tc_all['Qty'].head(10).sum() / total_qty_all * 100) if total_qty_all else 0
+            if conc_stats:
+                top5_cov, top10_cov = float(conc_stats['top5_coverage']), float(conc_stats['top10_coverage'])
+            else:
+                top5_cov = (tc_all['Qty'].head(5).sum() / total_qty_all * 100) if total_qty_all else 0
+                top10_cov = (tc_all['Qty'].head(10).sum() / total_qty_all * 100) if total_qty_all else 0
             st.caption(f"Top 5 coverage: **{top5_cov:.1f}%** · Top 10 coverage: **{top10_cov:.1f}%**")
 
         with c2:
             # Pareto chart (display subset; cum% is relative to ALL total)
-            fig_pareto = go.Figure()
-
-            # Bars: Qty
-            fig_pareto.add_bar(
-                x=tc_display['Client'],
-                y=tc_display['Qty'],
-                name='Qty'
-            )
-
-            # Line: Cum Share % relative to ALL total
-            tc_display = tc_display.copy()
-            tc_display['CumQty_all_ref'] = tc_display['Qty'].cumsum()
-            tc_display['CumShare%_all_ref'] = np.where(total_qty_all > 0, tc_display['CumQty_all_ref']/total_qty_all*100, 0)
-
-            fig_pareto.add_trace(go.Scatter(
-                x=tc_display['Client'],
-                y=tc_display['CumShare%_all_ref'],
-                mode='lines+markers',
-                name='Cum Share %',
-                yaxis='y2'
-            ))
-
-            # 80% horizontal benchmark
-            fig_pareto.add_shape(
-                type="line",
-                x0=-0.5, x1=len(tc_display)-0.5,
-                y0=80, y1=80,
-                line=dict(width=2, dash="dash", color="red"),
-                yref="y2"
-            )
-            fig_pareto.add_annotation(
-                x=max(0, len(tc_display)//2),
-                y=82,
-                text="80% Pareto Threshold",
-                showarrow=False,
-                font=dict(color="red", size=12),
-                yref="y2"
-            )
-
-            # Highlight crossing point if it falls within the displayed subset
-            if clients_to_80:
-                crossing_client = eighty_client
-                if crossing_client in list(tc_display['Client']):
-                    crossing_y = float(tc_all.loc[eighty_idx_all, 'CumShare%'])
-                    fig_pareto.add_trace(go.Scatter(
-                        x=[crossing_client],
-                        y=[crossing_y],
-                        mode='markers+text',
-                        name='80% Crossing',
-                        yaxis='y2',
-                        marker=dict(size=12, symbol='diamond'),
-                        text=[f"{clients_to_80} clients"],
-                        textposition='top center',
-                        hovertemplate="Client: %{x}<br>Cum Share: %{y:.1f}%<extra>80% crossing</extra>"
-                    ))
-
-            fig_pareto.update_layout(
-                title="Pareto — Cumulative Share of Quantity (Top Clients)",
-                xaxis=dict(title=None, tickangle=-30),
-                yaxis=dict(title='Qty'),
-                yaxis2=dict(title='Cum Share %', overlaying='y', side='right', range=[0, 100]),
-                legend=dict(x=0.02, y=0.98, bordercolor="Black", borderwidth=1)
-            )
-
+            fig_pareto = cached_figure(build_pareto, tc_display[['Client', 'Qty']], total_qty_all=float(total_qty_all),
+                                       clients_to_80=clients_to_80, eighty_client=eighty_client,
+                                       eighty_share=eighty_share)
             st.plotly_chart(fig_pareto, use_container_width=True)
 
         # Client concentration (HHI) based on ALL clients
-        client_hhi = concentration_hhi(tc_all['Qty'])
+        client_hhi = float(conc_stats['client_hhi']) if conc_stats else concentration_hhi(tc_all['Qty'])
         st.caption(f"Client Concentration (HHI): **{client_hhi:.3f}** (0=diverse, 1=monopoly)")
 
     # ---------- Route Distribution ----------
@@ -228,51 +293,57 @@ if selected_product:
 
         grouped_route_df = group_small_routes(route_distribution_df.copy(), 'total_quantity_sold', 'route', threshold)
 
-        r_sorted = route_distribution_df.sort_values('total_quantity_sold', ascending=False).rename(
-            columns={'route':'Route','total_quantity_sold':'Qty'}
-        )
-
         rc1, rc2 = st.columns([1,1])
         with rc1:
-            fig_route_bar = px.bar(r_sorted.head(10), x='Route', y='Qty', title="Top 10 Routes by Quantity", text='Qty')
-            fig_route_bar.update_layout(xaxis_title=None, yaxis_title="Qty", xaxis_tickangle=-30, showlegend=False)
+            fig_route_bar = cached_figure(build_route_bar, route_distribution_df)
             st.plotly_chart(fig_route_bar, use_container_width=True)
 
         with rc2:
-            fig_route_pie = px.pie(grouped_route_df.rename(columns={'route':'Route','total_quantity_sold':'Qty'}),
-                                   values='Qty', names='Route', title="Sales Distribution by Route (Grouped)")
+            fig_route_pie = cached_figure(build_route_pie, grouped_route_df)
             st.plotly_chart(fig_route_pie, use_container_width=True)
 
-        fig_treemap = px.treemap(grouped_route_df.rename(columns={'route':'Route','total_quantity_sold':'Qty'}),
-                                 path=['Route'], values='Qty',
-                                 title="Treemap — Route Contribution")
+        fig_treemap = cached_figure(build_route_treemap, grouped_route_df)
         st.plotly_chart(fig_treemap, use_container_width=True)
 
-        route_hhi = concentration_hhi(route_distribution_df.set_index('route')['total_quantity_sold'])
-        top3_share = pct(route_distribution_df['total_quantity_sold'].nlargest(3).sum(), total_qty)
+        if conc_stats:
+            route_hhi, top3_share = float(conc_stats['route_hhi']), float(conc_stats['top3_route_share'])
+        else:
+            route_hhi = concentration_hhi(route_distribution_df.set_index('route')['total_quantity_sold'])
+            top3_share = pct(route_distribution_df['total_quantity_sold'].nlargest(3).sum(), total_qty)
         st.caption(f"Route Concentration (HHI): **{route_hhi:.3f}** · Top 3 Routes Coverage: **{top3_share:.1f}%**")
 
     # ---------- Seasonality & Trend (optional) ----------
     if not monthly_df.empty and selected_month == "All":
         st.subheader("Seasonality & Trend")
         if 'total_quantity_sold' in monthly_df.columns:
-            fig_qty_trend = px.line(monthly_df, x='month', y='total_quantity_sold', markers=True,
-                                    title="Monthly Quantity Trend")
-            fig_qty_trend.update_layout(xaxis_title="Month", yaxis_title="Quantity")
+            fig_qty_trend = cached_figure(build_trend_line, monthly_df, value_col='total_quantity_sold',
+                                          title="Monthly Quantity Trend", yaxis_title="Quantity")
             st.plotly_chart(fig_qty_trend, use_container_width=True)
 
         if 'total_sales_amount' in monthly_df.columns:
-            fig_rev_trend = px.line(monthly_df, x='month', y='total_sales_amount', markers=True,
-                                    title="Monthly Revenue Trend")
-            fig_rev_trend.update_layout(xaxis_title="Month", yaxis_title="Revenue")
+            fig_rev_trend = cached_figure(build_trend_line, monthly_df, value_col='total_sales_amount',
+                                          title="Monthly Revenue Trend", yaxis_title="Revenue")
             st.plotly_chart(fig_rev_trend, use_container_width=True)
 
         meta_cols = [c for c in ['unique_clients','unique_routes'] if c in monthly_df.columns]
         if meta_cols:
-            fig_meta = px.bar(monthly_df, x='month', y=meta_cols, barmode='group',
-                              title="Monthly Reach — Unique Clients & Routes")
+            fig_meta = cached_figure(build_reach_bars, monthly_df, meta_cols=meta_cols)
             st.plotly_chart(fig_meta, use_container_width=True)
 
+    # ---------- Catalogue risk ranking (precomputed) ----------
+    risk_df = db.get_product_risk_ranking(selected_month)
+    if not risk_df.empty:
+        with st.expander("⚠️ Product Concentration Risk — whole catalogue"):
+            risk_view = risk_df[['item_description', 'client_hhi', 'clients_to_80', 'top5_coverage',
+                                 'route_hhi', 'top3_route_share', 'n_clients', 'total_quantity']].rename(columns={
+                'item_description': 'Product', 'client_hhi': 'Client HHI', 'clients_to_80': 'Clients to 80%',
+                'top5_coverage': 'Top 5 Coverage %', 'route_hhi': 'Route HHI',
+                'top3_route_share': 'Top 3 Routes %', 'n_clients': 'Clients', 'total_quantity': 'Qty'
+            })
+            st.dataframe(compact(risk_view), use_container_width=True)
+
     # ---------- Empty state ----------
     if top_clients_df.empty and route_distribution_df.empty:
         st.info("No data found for the current selection. Try a different month or product.")
+
+latency_panel("Product Profile")
@@ -1,7 +1,15 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 from conn1 import MySQLDatabase  # Import the Database class
+from figure_cache import cached_figure
+from categories import compact
+from charts import line_traces
+from widgets import paginated_table, latency_panel
+import tracing
+
+tracing.begin_page("All Client Types")
 
 # Initialize the database connection
 db = MySQLDatabase()
@@ -17,21 +25,20 @@ selected_percentage = st.sidebar.slider("Select Percentage", 0, 100, 1)
 # --- New Page for Top Clients Based on Selection ---
 st.title(f"Top {selected_percentage}% {selected_client_type} by Sales")
 
-# Fetch product sales for the top clients based on selected client type and percentage
-top_clients_product_sales_df = db.get_top_clients_product_sales(selected_client_type, selected_percentage)
-
-# Fetch monthly product sales for the top clients
-monthly_product_sales_df = db.get_monthly_clients_product_sales(selected_client_type, selected_percentage)
+# Clients of the type in rank order with prefix sums of their sales and their month x product sales,
+# loaded once per process (precomputed by precompute.py when available); every slider position is a
+# slice of these arrays, so moving the slider sends no query
+segments = db.get_client_segments(selected_client_type)
 
-# Fetch top clients based on selected client type and percentage
-top_clients_df = db.get_top_clients(selected_client_type, selected_percentage)
+# Top clients together with the total sales of the client type and of all customers
+top_clients_df, total_client_type_sales, total_sales = segments.segment(selected_percentage)
 
-# Fetch total sales for the selected client type and all customers
-total_client_type_sales = db.get_total_sales_by_client_type(selected_client_type)
-total_sales = db.get_total_overall_sales()
+# Product sales of the top clients, per month (the treemap sums the months)
+top_clients_product_sales_df = segments.product_sales(selected_percentage)
+monthly_product_sales_df = top_clients_product_sales_df.copy()
 
-# Calculate the total sales of the top clients
-top_clients_total_sales = top_clients_df['total_sales'].sum()
+# Total sales of the top clients (prefix sum over the ranked clients)
+top_clients_total_sales = segments.selected_total(selected_percentage)
 
 # Calculate the percentage of top clients' sales out of all client type sales and total sales
 percentage_of_client_type_sales = (top_clients_total_sales / total_client_type_sales) * 100
@@ -60,40 +67,49 @@ st.write(f"Percentage of total sales (all customers): **{percentage_of_total_sal
 st.subheader(f"Sales Distribution of Top {selected_percentage}% {selected_client_type}")
 
 # Create a bar chart for the top clients
-fig_bar = px.bar(
-    top_clients_df, 
-    x='client_name', 
-    y='total_sales', 
-    title=f"Top {selected_percentage}% {selected_client_type} by Total Sales", 
-    labels={'client_name': f"{selected_client_type} Name", 'total_sales': 'Total Sales'},
-    text='total_sales'
-)
-
-# Update the layout for better readability
-fig_bar.update_layout(
-    xaxis_title=f"{selected_client_type} Name",
-    yaxis_title="Total Sales",
-    xaxis_tickangle=-45,
-    hovermode="x unified"
-)
+def build_top_clients_bar(df, client_type, percentage):
+    fig = px.bar(
+        df, 
+        x='client_name', 
+        y='total_sales', 
+        title=f"Top {percentage}% {client_type} by Total Sales", 
+        labels={'client_name': f"{client_type} Name", 'total_sales': 'Total Sales'},
+        text='total_sales'
+    )
+
+    # Update the layout for better readability
+    fig.update_layout(
+        xaxis_title=f"{client_type} Name",
+        yaxis_title="Total Sales",
+        xaxis_tickangle=-45,
+        hovermode="x unified"
+    )
+    return fig
+
+fig_bar = cached_figure(build_top_clients_bar, compact(top_clients_df[['client_name', 'total_sales']]),
+                        client_type=selected_client_type, percentage=selected_percentage)
 
 # Display the bar chart
 st.plotly_chart(fig_bar)
 top_clients_df[['total_sales', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep']] = top_clients_df[['total_sales', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep']].round(0)
-# Display the top clients DataFrame
-st.write(top_clients_df)
+# Display the top clients DataFrame (one page at a time; 100% of 'All' is thousands of rows)
+paginated_table(top_clients_df, key='top_clients', sort_by='total_sales')
 
 # --- Cumulative Product Sales for Top Clients ---
 st.subheader(f"Cumulative Product Sales for Top {selected_percentage}% {selected_client_type}")
 
 # Create the treemap for cumulative product sales for the top clients
-fig_treemap = px.treemap(
-    top_clients_product_sales_df,
-    path=['item_description'],
-    values='total_sales_amt',
-    title=f"Cumulative Product Sales for Top {selected_percentage}% {selected_client_type}",
-    labels={'total_sales_amt': 'Total Sales Amount (Ksh)'}
-)
+def build_product_treemap(df, client_type, percentage):
+    return px.treemap(
+        compact(df),
+        path=['item_description'],
+        values='total_sales_amt',
+        title=f"Cumulative Product Sales for Top {percentage}% {client_type}",
+        labels={'total_sales_amt': 'Total Sales Amount (Ksh)'}
+    )
+
+fig_treemap = cached_figure(build_product_treemap, top_clients_product_sales_df,
+                            client_type=selected_client_type, percentage=selected_percentage)
 
 # Display the treemap
 st.plotly_chart(fig_treemap)
@@ -102,14 +118,21 @@ st.plotly_chart(fig_treemap)
 st.subheader(f"Monthly Product Sales for Top {selected_percentage}% {selected_client_type}")
 
 # Create the line chart for monthly product sales for the top clients
-fig_line = px.line(
-    monthly_product_sales_df,
-    x='month',
-    y='total_sales_amt',
-    color='item_description',
-    title=f"Monthly Product Sales for Top {selected_percentage}% {selected_client_type}",
-    labels={'total_sales_amt': 'Total Sales Amount (Ksh)', 'month': 'Month', 'item_description': 'Product'}
-)
+def build_monthly_product_lines(df, client_type, percentage):
+    fig = go.Figure(line_traces(df, 'item_description', 'month', 'total_sales_amt', mode='lines',
+                                hovertemplate='Product: {name}<br>Month: %{x}<br>Sales: %{y:,.0f}<extra></extra>'))
+    fig.update_layout(
+        title=f"Monthly Product Sales for Top {percentage}% {client_type}",
+        xaxis_title='Month',
+        yaxis_title='Total Sales Amount (Ksh)',
+        legend_title='Product'
+    )
+    return fig
+
+fig_line = cached_figure(build_monthly_product_lines, monthly_product_sales_df,
+                         client_type=selected_client_type, percentage=selected_percentage)
 
 # Display the line chart
 st.plotly_chart(fig_line)
+
+latency_panel("All Client Types")
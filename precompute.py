@@ -0,0 +1,169 @@
+"""
+Headless batch precompute of the page datasets.
+
+Runs the same data preparation the pages do, for every client, product,
+sales manager and client type, spread over worker processes (one MySQL
+connection each), and writes the results to the local result_store that
+the pages read first. Run it after each data refresh, ahead of the morning
+peak:
+
+    python precompute.py                        # every job
+    python precompute.py customers products     # selected jobs
+    python precompute.py --workers 8
+"""
+import argparse
+import importlib
+import multiprocessing
+import os
+import time
+
+import result_store
+
+
+JOBS = ('customers', 'products', 'managers', 'client_types')
+
+# Option lists offered by the pages
+SALES_MANAGERS = ["George Omondi", "Joshua Ageta", "Kennedy Mutisya", "Jarso Abdi", "Nicholas Dass",
+                  "Nicholas Baraka", "Mourice Kevin Barasa"]
+MANAGER_MONTHS = ['All', 'Jan', 'Feb', 'March', 'April', 'May', 'June', 'July', 'August', 'September']
+PRODUCT_MONTHS = ['All', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+CLIENT_TYPES = ['All', 'DISTRIBUTORS', 'SPECIAL DISTRIBUTOR', 'MINIMART', 'KABL OFFICE', 'M/BIKE', 'SUPERMARKET',
+                'KABL STAFF', 'SCHOOLS', 'LOCAL CUSTOMERS', 'CORPORATES']
+
+
+# One connection per worker process, opened by the pool initializer
+_db = None
+
+
+def _connect(module='conn1'):
+    # conn1: main.py and pages 1-3; conn: the Sales Managers page's database
+    MySQLDatabase = importlib.import_module(module).MySQLDatabase
+
+    db = MySQLDatabase()
+    db.connect()
+    if db.conn is None:
+        raise RuntimeError("Could not connect to the database")
+    return db
+
+
+def _init_worker(module='conn1'):
+    global _db
+    _db = _connect(module)
+
+
+# -------------------------
+# Tasks (run inside workers)
+# -------------------------
+def customer_task(client):
+    """Customer Profile: summary, cross-sell and route share, stored as the page's section memo."""
+    from client_profile import (order_months, active_months_frame, summary_metrics,
+                                build_boolean_basket_matrix, cross_sell_metrics, route_share)
+
+    detailed = order_months(_db.get_client_product_sales_detailed(client))
+    csd = active_months_frame(detailed)
+    memo = {
+        ('detailed',): detailed,
+        ('summary',): summary_metrics(csd),
+        ('cross_sell',): cross_sell_metrics(build_boolean_basket_matrix(csd)),
+        ('route',): route_share(_db, order_months(_db.get_client_sales(client))),
+    }
+    result_store.save('customer_profile', memo, client)
+    return 1
+
+
+def product_task(product):
+    """Product Profile: every client and route breakdown for each month the page offers."""
+    for month in PRODUCT_MONTHS:
+        result_store.save('product_top_clients',
+                          _db.get_top_clients_for_product(product, month, limit=None), product, month)
+        result_store.save('product_route_distribution',
+                          _db.get_sales_distribution_by_route(product, month), product, month)
+    return 1
+
+
+def manager_task(product):
+    """Sales Managers: rankings, top managers/clients and monthly series for one product filter."""
+    for month in MANAGER_MONTHS:
+        ranking = _db.get_sales_manager_ranking('All', month, product)
+        result_store.save('manager_ranking', ranking, month, product)
+        result_store.save('top_sales_managers',
+                          ranking[['sales_manager', 'total_sales']].head(5).reset_index(drop=True), month, product)
+        result_store.save('manager_cumulative_sales',
+                          _db.get_cumulative_sales_by_manager('All', month, product), month, product)
+        for manager in SALES_MANAGERS:
+            result_store.save('manager_top_clients',
+                              _db.get_top_5_clients_by_manager_and_product(
+                                  manager, month, product=None if product == 'All' else product),
+                              manager, month, product)
+    for manager in SALES_MANAGERS:
+        result_store.save('manager_monthly_sales', _db.get_monthly_sales_by_manager(manager, product),
+                          manager, product)
+    result_store.save('manager_median_sales', _db.get_median_sales_by_month(product), product)
+    return 1
+
+
+def client_type_task(client_type):
+    """All Client Types: ranked clients with prefix sums and product sales, serving every slider position."""
+    result_store.save('client_segments', _db.get_client_segments(client_type, refresh=True), client_type)
+    return 1
+
+
+# -------------------------
+# Driver
+# -------------------------
+def _run_parallel(name, task, items, workers, module='conn1'):
+    started = time.perf_counter()
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(module,)) as pool:
+        done = sum(pool.imap_unordered(task, items, chunksize=max(1, len(items) // (workers * 8))))
+    print(f"{name}: {done} item(s) in {time.perf_counter() - started:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('jobs', nargs='*', help=f"jobs to run: {', '.join(JOBS)} (default: all)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument('--clear', action='store_true', help="drop the existing store first")
+    args = parser.parse_args(argv)
+    jobs = args.jobs or list(JOBS)
+    unknown = sorted(set(jobs) - set(JOBS))
+    if unknown:
+        parser.error(f"unknown job(s): {', '.join(unknown)}")
+
+    if args.clear:
+        result_store.clear()
+
+    # Running pages and the API drop their in-memory aggregates built from the previous data
+    from conn1 import refresh_precomputed
+    refresh_precomputed()
+
+    # Option lists come from the same name indexes the pages use
+    db = _connect()
+    try:
+        clients = db.get_all_clients()
+        products = db.get_all_products()
+        if 'products' in jobs:
+            # Concentration stats are one vectorized pass; no need to fan out
+            from product_stats import compute_concentration_stats
+            db.save_product_concentration_stats(compute_concentration_stats(db.get_product_client_route_sales()))
+    finally:
+        db.close()
+    if 'managers' in jobs:
+        db = _connect('conn')
+        try:
+            manager_products = db.get_all_products()
+        finally:
+            db.close()
+
+    if 'customers' in jobs:
+        _run_parallel('customers', customer_task, clients, args.workers)
+    if 'products' in jobs:
+        _run_parallel('products', product_task, products, args.workers)
+    if 'managers' in jobs:
+        _run_parallel('managers', manager_task, ['All'] + manager_products, args.workers, module='conn')
+    if 'client_types' in jobs:
+        _run_parallel('client_types', client_type_task, CLIENT_TYPES, args.workers)
+
+
+if __name__ == "__main__":
+    main()
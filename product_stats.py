@@ -0,0 +1,111 @@
+"""
+Per-product concentration statistics for the Product Profile page.
+
+Client HHI, clients-to-80%, top-5/top-10 client coverage, route HHI and
+top-3 route share are computed for every product and month (plus 'All')
+in one vectorized pass over sales_per_client, then stored in the
+product_concentration_stats table so the page only does a lookup.
+
+Run as a batch job after each data refresh:
+
+    python product_stats.py
+"""
+import numpy as np
+import pandas as pd
+
+
+STATS_COLUMNS = [
+    'item_description', 'month', 'total_quantity', 'total_revenue', 'n_clients', 'n_routes',
+    'client_hhi', 'clients_to_80', 'client_at_80', 'share_at_80',
+    'top5_coverage', 'top10_coverage', 'route_hhi', 'top3_route_share',
+]
+
+
+def normalize_month(months: pd.Series) -> pd.Series:
+    """Map DB month labels ('March', 'September', ...) to the page's 3-letter labels."""
+    return months.astype(str).str[:3].str.title()
+
+
+def _ranked_shares(df: pd.DataFrame, keys: list, entity: str) -> pd.DataFrame:
+    """
+    Sum quantity per (keys + entity), sort descending within each key group and
+    attach share, cumulative share and 0-based rank (all shares in %).
+    """
+    agg = df.groupby(keys + [entity], observed=True, sort=False)['quantity'].sum().reset_index()
+    agg = agg.sort_values(keys + ['quantity'], ascending=[True] * len(keys) + [False], kind='stable')
+    grp = agg.groupby(keys, observed=True, sort=False)['quantity']
+    total = grp.transform('sum')
+    agg['share'] = np.where(total > 0, agg['quantity'] / total.where(total > 0, 1) * 100, 0.0)
+    agg['share_sq'] = (agg['share'] / 100) ** 2
+    agg['cum_share'] = agg.groupby(keys, observed=True, sort=False)['share'].cumsum()
+    agg['rank'] = agg.groupby(keys, observed=True, sort=False).cumcount()
+    return agg
+
+
+def _entity_stats(ranked: pd.DataFrame, keys: list, entity: str, top_ns: list, prefix: str) -> pd.DataFrame:
+    grp = ranked.groupby(keys, observed=True, sort=False)
+    out = pd.DataFrame({
+        f'n_{prefix}s': grp[entity].size(),
+        f'{prefix}_hhi': grp['share_sq'].sum(),
+    })
+    for n in top_ns:
+        name = f'top{n}_coverage' if prefix == 'client' else f'top{n}_{prefix}_share'
+        out[name] = ranked[ranked['rank'] < n].groupby(keys, observed=True, sort=False)['share'].sum()
+    return out
+
+
+def compute_concentration_stats(detail_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    detail_df: one row per (item_description, month, customer_name, route) with
+    'quantity' and 'sales_amt' columns (see MySQLDatabase.get_product_client_route_sales).
+    Returns one row per (item_description, month) including month == 'All'.
+    """
+    if detail_df.empty:
+        return pd.DataFrame(columns=STATS_COLUMNS)
+
+    df = detail_df.copy()
+    df['month'] = normalize_month(df['month'])
+    df['route'] = df['route'].astype(object).fillna('Unknown Route')
+    # Stack the per-month rows with an 'All' copy so both views come out of the same pass
+    df = pd.concat([df, df.assign(month='All')], ignore_index=True)
+    keys = ['item_description', 'month']
+
+    clients = _ranked_shares(df, keys, 'customer_name')
+    routes = _ranked_shares(df, keys, 'route')
+
+    stats = pd.DataFrame({
+        'total_quantity': df.groupby(keys, observed=True, sort=False)['quantity'].sum(),
+        'total_revenue': df.groupby(keys, observed=True, sort=False)['sales_amt'].sum(),
+    })
+    stats = stats.join(_entity_stats(clients, keys, 'customer_name', [5, 10], 'client'))
+    stats = stats.join(_entity_stats(routes, keys, 'route', [3], 'route'))
+
+    # Pareto-80: the client whose cumulative share first reaches 80%
+    crossing = clients[clients['cum_share'] >= 80].groupby(keys, observed=True, sort=False).head(1)
+    crossing = crossing.set_index(keys)[['rank', 'customer_name', 'cum_share']]
+    crossing.columns = ['clients_to_80', 'client_at_80', 'share_at_80']
+    crossing['clients_to_80'] = crossing['clients_to_80'] + 1
+    stats = stats.join(crossing)
+
+    stats = stats.reset_index()
+    return stats[STATS_COLUMNS]
+
+
+def main():
+    from conn1 import MySQLDatabase, refresh_precomputed
+
+    db = MySQLDatabase()
+    db.connect()
+    try:
+        detail_df = db.get_product_client_route_sales()
+        stats = compute_concentration_stats(detail_df)
+        db.save_product_concentration_stats(stats)
+        refresh_precomputed()
+        print(f"Stored concentration stats for {stats['item_description'].nunique()} products "
+              f"({len(stats)} product/month rows)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
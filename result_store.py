@@ -0,0 +1,130 @@
+"""
+Local store of precomputed page datasets.
+
+precompute.py fills it in a batch run; the pages read it first through
+load(..., current=True) / stored() and only query MySQL for keys that are
+missing or were saved before the last data load. Each result is one pickle file under STORE_DIR/<kind>/, named by a hash of its
+key and written atomically, so a page never reads a half-written file
+while a batch run is in progress.
+
+The location defaults to ./precomputed next to this module and can be
+moved with the KENAFRIC_STORE_DIR environment variable.
+
+Label columns encoded over the shared dictionaries are stored as plain
+strings: the categorical codes of the process that saved a frame (see
+categories.py) mean nothing in another process, so load() re-encodes frames
+over the reading process's dictionaries. Ordered categoricals (calendar
+months) are stored as they are.
+
+The store also holds the data version: a stamp file touched by
+mark_data_loaded() after each data load. Processes compare data_version()
+with the version their in-memory aggregates were built from (see
+conn1.refresh_precomputed) and rebuild them when it has changed.
+"""
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+import categories
+
+
+STORE_DIR = os.environ.get(
+    'KENAFRIC_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'precomputed'),
+)
+
+VERSION_FILE = os.path.join(STORE_DIR, 'DATA_VERSION')
+
+
+def _path(kind, key):
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()
+    return os.path.join(STORE_DIR, kind, f"{digest}.pkl")
+
+
+def _plain(value):
+    """
+    `value` with the shared-dictionary columns of its frames (also inside dicts, lists, tuples) as objects.
+    Other categoricals, such as calendar-ordered months, are kept as they are.
+    """
+    if isinstance(value, pd.DataFrame):
+        columns = categories.shared_columns(value)
+        return value.astype({c: object for c in columns}) if columns else value
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if type(value) in (list, tuple):
+        return type(value)(_plain(v) for v in value)
+    return value
+
+
+def _encoded(value):
+    """Inverse of _plain(): label columns of frames back to this process's shared categoricals."""
+    if isinstance(value, pd.DataFrame):
+        return categories.encode(value)
+    if isinstance(value, dict):
+        return {k: _encoded(v) for k, v in value.items()}
+    if type(value) in (list, tuple):
+        return type(value)(_encoded(v) for v in value)
+    return value
+
+
+def save(kind, value, *key):
+    """Store `value` under (kind, *key), replacing any previous result."""
+    path = _path(kind, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(_plain(value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load(kind, *key, default=None, current=False):
+    """
+    Stored result for (kind, *key), or `default` when it has not been precomputed.
+    current=True also returns `default` for a result saved before the last data load.
+    """
+    path = _path(kind, key)
+    try:
+        if current and os.stat(path).st_mtime_ns < data_version():
+            return default
+        with open(path, 'rb') as f:
+            return _encoded(pickle.load(f))
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return default
+
+
+def stored(kind, compute, *key):
+    """
+    Stored result for (kind, *key) if present and saved since the last data load,
+    otherwise compute() live (not written back).
+    """
+    value = load(kind, *key, current=True)
+    return compute() if value is None else value
+
+
+def clear(kind=None):
+    """Drop every stored result, or only those of one kind."""
+    shutil.rmtree(os.path.join(STORE_DIR, kind) if kind else STORE_DIR, ignore_errors=True)
+
+
+def data_version():
+    """Stamp of the last data load (mtime of VERSION_FILE in ns), or 0 before the first one."""
+    try:
+        return os.stat(VERSION_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def mark_data_loaded():
+    """Record a data load: every process sees a new data_version()."""
+    os.makedirs(STORE_DIR, exist_ok=True)
+    with open(VERSION_FILE, 'w') as f:
+        f.write(f"{time.time()}\n")
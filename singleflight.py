@@ -0,0 +1,63 @@
+"""
+In-flight deduplication of identical concurrent calls.
+
+When several threads (Streamlit sessions, API requests) ask for the same
+key at once, only the first runs the function; the others wait for it and
+receive its result, or its exception. Nothing is cached: once the call
+finishes, the next request for the key runs again.
+"""
+import threading
+
+
+class _Call():
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.results = []
+        self.error = None
+
+
+class SingleFlight():
+    def __init__(self, copy=None):
+        """copy(result) gives each waiter its own copy (e.g. of a DataFrame the caller may modify)."""
+        self._copy = copy
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """fn() for the first caller of `key`; concurrent callers of the same key share that result."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            with self._lock:
+                return call.results.pop()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+            call.error = e
+            call.done.set()
+            raise
+
+        with self._lock:
+            # No waiter can join once the call is removed, so the copies made here are all that is needed
+            del self._calls[key]
+            call.results = [self._copy(result) if self._copy else result for _ in range(call.waiters)]
+        call.done.set()
+        return result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,155 @@
+"""
+Slow-query log for MySQLDatabase.
+
+Every query run through MySQLDatabase._read_sql is timed per calling
+method. Queries slower than SLOW_QUERY_MS are written as one JSON line
+each, with their parameters, duration, row count and EXPLAIN FORMAT=JSON
+plan, to a rotating log file. The plan flags that usually explain a slow
+dashboard query (full table scans, filesorts, temporary tables) are
+extracted at write time, so the summary below does not need to re-read
+the plans.
+
+Summarise the log by method:
+
+    python slow_queries.py [path]
+
+Settings (environment): KENAFRIC_SLOW_QUERY_MS (default 500) and
+KENAFRIC_SLOW_QUERY_LOG (default ./slow_queries.log next to this module).
+"""
+import json
+import logging
+import os
+import sys
+import threading
+from logging.handlers import RotatingFileHandler
+
+import pandas as pd
+
+
+SLOW_QUERY_MS = float(os.environ.get('KENAFRIC_SLOW_QUERY_MS', 500))
+SLOW_QUERY_LOG = os.environ.get(
+    'KENAFRIC_SLOW_QUERY_LOG',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'slow_queries.log'),
+)
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 5
+
+_logger = None
+_logger_lock = threading.Lock()
+
+# method -> {'calls', 'total_ms', 'max_ms', 'slow'} for every query in this process
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _get_logger():
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            logger = logging.getLogger('kenafric.slow_queries')
+            if not logger.handlers:
+                handler = RotatingFileHandler(SLOW_QUERY_LOG, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            _logger = logger
+    return _logger
+
+
+def plan_flags(plan):
+    """Tables read by full scan, and whether a filesort / temporary table is used, from an EXPLAIN JSON plan."""
+    full_scans, filesort, temporary = [], False, False
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if node.get('access_type') == 'ALL':
+                full_scans.append(node.get('table_name'))
+            filesort = filesort or bool(node.get('using_filesort'))
+            temporary = temporary or bool(node.get('using_temporary_table'))
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return {'full_scans': full_scans, 'filesort': filesort, 'temporary_table': temporary}
+
+
+def record(method, elapsed_ms):
+    """Add one query timing to the per-method stats; True if it counts as slow."""
+    slow = elapsed_ms >= SLOW_QUERY_MS
+    with _stats_lock:
+        entry = _stats.setdefault(method, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'slow': 0})
+        entry['calls'] += 1
+        entry['total_ms'] += elapsed_ms
+        entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+        entry['slow'] += slow
+    return slow
+
+
+def log_slow_query(method, query, params, elapsed_ms, rows, plan):
+    entry = {
+        'method': method,
+        'duration_ms': round(elapsed_ms, 1),
+        'rows': rows,
+        'params': [str(p) for p in params] if params else [],
+        'query': ' '.join(query.split()),
+        'plan': plan,
+    }
+    if isinstance(plan, dict) and 'error' not in plan:
+        entry.update(plan_flags(plan))
+    _get_logger().info(json.dumps(entry, default=str))
+
+
+def query_stats():
+    """Per-method timings of the queries run by this process, slowest total first."""
+    with _stats_lock:
+        rows = [dict(method=m, **s) for m, s in _stats.items()]
+    df = pd.DataFrame(rows, columns=['method', 'calls', 'total_ms', 'max_ms', 'slow'])
+    df['mean_ms'] = df['total_ms'] / df['calls']
+    return df.sort_values('total_ms', ascending=False).reset_index(drop=True)
+
+
+def summarize_log(path=SLOW_QUERY_LOG):
+    """Slow queries in the log (and its rotated files) summarised by method."""
+    entries = []
+    for candidate in [path] + [f"{path}.{i}" for i in range(1, LOG_BACKUPS + 1)]:
+        if not os.path.exists(candidate):
+            continue
+        with open(candidate) as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    columns = ['method', 'slow_queries', 'mean_ms', 'max_ms', 'full_scan_queries', 'filesort_queries', 'tables_scanned']
+    if not entries:
+        return pd.DataFrame(columns=columns)
+
+    df = pd.DataFrame(entries)
+    for col, default in (('full_scans', None), ('filesort', False)):
+        if col not in df.columns:
+            df[col] = default
+    df['full_scans'] = df['full_scans'].apply(lambda v: v if isinstance(v, list) else [])
+    df['filesort'] = df['filesort'].fillna(False).astype(bool)
+    summary = df.groupby('method').agg(
+        slow_queries=('duration_ms', 'size'),
+        mean_ms=('duration_ms', 'mean'),
+        max_ms=('duration_ms', 'max'),
+        full_scan_queries=('full_scans', lambda s: int(sum(bool(v) for v in s))),
+        filesort_queries=('filesort', 'sum'),
+        tables_scanned=('full_scans', lambda s: ', '.join(sorted({t for v in s for t in v if t}))),
+    ).reset_index()
+    return summary.sort_values('slow_queries', ascending=False)[columns].reset_index(drop=True)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else SLOW_QUERY_LOG
+    summary = summarize_log(path)
+    if summary.empty:
+        print(f"No slow queries logged in {path}")
+    else:
+        print(summary.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
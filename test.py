@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from conn import MySQLDatabase  # Import the Database class
+from client_profile import share_of_route
+from categories import compact
 import numpy as np
 
 # Initialize the database connection
@@ -27,35 +29,17 @@ if selected_client:
     # Calculate the percentage of route sales attributed to the client
     st.header(f"Percentage of Route Sales Attributed to {selected_client}")
 
-    total_route_sales = []
-    percentages = []
-
     # Extract the route name from the first row (assuming the route is the same across months for the client)
     route_name = client_sales_df['route'].iloc[0] if not client_sales_df.empty else "Unknown Route"
 
-    for _, row in client_sales_df.iterrows():
-        route = row['route']
-        month = row['month']
-        
-        # Check if route or month is NaN, if so, skip that iteration
-        if pd.isna(route) or pd.isna(month):
-            total_route_sales.append(np.nan)  # Append NaN if data is invalid
-            percentages.append(0)  # Set percentage to 0 in case of invalid data
-            continue
-        
-        # Fetch total route sales for the given route and month
-        route_sales = db.get_route_sales_for_client(route, month)
-        
-        # Add route sales to the total_route_sales list
-        total_route_sales.append(route_sales)
-
-        # Calculate the percentage of total route sales attributed to the client
-        if route_sales > 0:
-            percentage = (row['total_sales'] / route_sales) * 100
-        else:
-            percentage = 0  # If no route sales, percentage is 0
-
-        percentages.append(percentage)
+    # Route totals for every month come from the in-memory route x month matrix in one lookup
+    total_route_sales, percentages = share_of_route(client_sales_df, db.get_route_month_totals(),
+                                                    value_col='total_sold_to_client')
+
+    # Rows without a route or month get no route total and a 0 percentage
+    invalid = (client_sales_df['route'].isna() | client_sales_df['month'].isna()).to_numpy()
+    total_route_sales[invalid] = np.nan
+    percentages[invalid] = 0
 
     # Add the total route sales and percentage to the DataFrame
     client_sales_df['total_route_sales'] = total_route_sales
@@ -68,7 +52,7 @@ if selected_client:
     client_sales_df = client_sales_df[['month', 'total_sold_to_client', 'total_route_sales', 'percentage_of_route']]
 
     # Display the main DataFrame without the index column
-    st.write(client_sales_df.reset_index(drop=True))
+    st.write(compact(client_sales_df.reset_index(drop=True)))
 
     # --- New Table: Change in Sales per Month for Client and Route ---
 
@@ -93,7 +77,7 @@ if selected_client:
                                     'route_sales_change', 'route_sales_percentage_change']]
 
     # Display the sales change table without the index column
-    st.write(sales_change_df.reset_index(drop=True))
+    st.write(compact(sales_change_df.reset_index(drop=True)))
     
     # Plot Percentage Change Graph
     client_sales_df['client_sales_percentage_change'] = client_sales_df['client_sales_percentage_change'].fillna(0)
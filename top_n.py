@@ -0,0 +1,92 @@
+"""
+Top-K selection over local aggregates.
+
+"Top K X by Y" is answered with a partial selection (numpy.argpartition,
+linear in the number of rows) and only the K winners are sorted, per group
+when the question is top K per month / route / manager. The whole frame is
+never sorted.
+
+top_totals() sums a value over the aggregate first (after optional
+column=value filters) and is memoized per aggregate frame, so repeated
+requests from page reruns are dictionary lookups. The memo belongs to the
+frame object: rebuilding an aggregate (refresh=True in MySQLDatabase)
+starts a fresh memo.
+"""
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+_MAX_RESULTS = 256  # memoized results per aggregate
+
+_memos = {}  # id(aggregate) -> (weakref to aggregate, OrderedDict of results)
+_memos_lock = threading.Lock()
+
+
+def top_k_positions(values, k=None) -> np.ndarray:
+    """Positions of the k largest values, largest first (ties by position, NaN never ahead of numbers)."""
+    values = np.asarray(values, dtype=float)
+    keyed = np.where(np.isnan(values), -np.inf, values)
+    if k is None or k >= len(keyed):
+        candidates = np.arange(len(keyed))
+    elif k <= 0:
+        return np.array([], dtype=np.intp)
+    else:
+        candidates = np.argpartition(-keyed, k - 1)[:k]
+    return candidates[np.lexsort((candidates, -keyed[candidates]))]
+
+
+def top_k(df: pd.DataFrame, value: str, k=None, group=None) -> pd.DataFrame:
+    """Rows of `df` with the k largest `value`, largest first; within each `group` (column or list) if given."""
+    values = df[value].to_numpy(dtype=float)
+    if group is None or df.empty:
+        positions = top_k_positions(values, k)
+    else:
+        codes = df.groupby(group, observed=True, sort=False, dropna=False).ngroup().to_numpy()
+        order = np.argsort(codes, kind='stable')
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        positions = np.concatenate([rows[top_k_positions(values[rows], k)] for rows in np.split(order, bounds)])
+    return df.iloc[positions].reset_index(drop=True)
+
+
+def _memo_for(aggregate):
+    with _memos_lock:
+        entry = _memos.get(id(aggregate))
+        if entry is None or entry[0]() is not aggregate:
+            key = id(aggregate)
+            entry = _memos[key] = (weakref.ref(aggregate, lambda _, key=key: _memos.pop(key, None)), OrderedDict())
+        return entry[1]
+
+
+def top_totals(aggregate: pd.DataFrame, keys, value: str, k=None, group=None, **where) -> pd.DataFrame:
+    """
+    Sum `value` per `keys` (per group + keys if `group` is given) over the rows of
+    `aggregate` matching every column=value in `where` (None means no filter),
+    and return the k largest totals, largest first. Memoized per aggregate.
+    """
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    groups = [] if group is None else [group] if isinstance(group, str) else list(group)
+    where = {c: v for c, v in where.items() if v is not None}
+    memo_key = (tuple(keys), value, k, tuple(groups), tuple(sorted(where.items())))
+
+    memo = _memo_for(aggregate)
+    with _memos_lock:
+        result = memo.get(memo_key)
+        if result is not None:
+            memo.move_to_end(memo_key)
+            return result.copy()
+
+    rows = aggregate
+    for column, wanted in where.items():
+        rows = rows[rows[column] == wanted]
+    totals = rows.groupby(groups + keys, observed=True, sort=False, dropna=False)[value].sum().reset_index()
+    result = top_k(totals, value, k, group=groups or None)
+
+    with _memos_lock:
+        memo[memo_key] = result
+        while len(memo) > _MAX_RESULTS:
+            memo.popitem(last=False)
+    return result.copy()
@@ -0,0 +1,111 @@
+"""
+Per-rerun latency tracing for the Streamlit pages.
+
+A page calls begin_page(name) at the top and end_page() at the bottom of
+its script. In between, span(stage, name) times a block. Stages are:
+- 'query': MySQLDatabase._read_sql opens these automatically;
+- 'transform': pandas work the page wraps explicitly;
+- 'chart': figure_cache.cached_figure opens these automatically.
+
+Spans nest, and each one is charged only its own time, so a query run
+inside a transform span is not counted twice. Time outside any span is
+reported as 'other'.
+
+Finished reruns are kept in a rolling window per page. latency_summary()
+reports p50/p95 per page and stage over that window.
+"""
+import contextvars
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+
+STAGES = ('query', 'transform', 'chart', 'other')
+WINDOW = 200  # reruns kept per page
+
+_current = contextvars.ContextVar('kenafric_page_trace', default=None)
+_history = defaultdict(lambda: deque(maxlen=WINDOW))  # page -> deque of {stage: ms, 'total': ms}
+_history_lock = threading.Lock()
+
+
+class _Trace():
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.spans = []  # (stage, name, own ms) in completion order
+        self.stack = []  # child time accumulated by each open span
+
+    def finish(self):
+        total = (time.perf_counter() - self.started) * 1000
+        record = dict(self.stages)
+        record['other'] = max(0.0, total - sum(v for k, v in record.items() if k != 'other'))
+        record['total'] = total
+        with _history_lock:
+            _history[self.page].append(record)
+        return record
+
+
+def begin_page(page):
+    """Start tracing one rerun of `page`. A trace left open by an interrupted rerun is recorded first."""
+    previous = _current.get()
+    if previous is not None:
+        previous.finish()
+    _current.set(_Trace(page))
+
+
+def end_page():
+    """Finish the current rerun's trace; returns its {stage: ms, 'total': ms} record (None if not tracing)."""
+    trace = _current.get()
+    if trace is None:
+        return None
+    _current.set(None)
+    return trace.finish()
+
+
+@contextmanager
+def span(stage, name=None):
+    """Time a block as `stage` in the current page trace (no-op outside a page)."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    trace.stack.append(0.0)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        own = elapsed - trace.stack.pop()
+        if trace.stack:
+            trace.stack[-1] += elapsed
+        trace.stages[stage] = trace.stages.get(stage, 0.0) + own
+        trace.spans.append((stage, name, own))
+
+
+def current_spans():
+    """Spans finished so far in this rerun, as a DataFrame (empty outside a page)."""
+    trace = _current.get()
+    return pd.DataFrame(trace.spans if trace else [], columns=['stage', 'name', 'ms'])
+
+
+def latency_summary(page=None):
+    """p50/p95 (ms) per page and stage over the rolling window of finished reruns."""
+    with _history_lock:
+        snapshot = {p: list(records) for p, records in _history.items() if page is None or p == page}
+    rows = []
+    for p, records in snapshot.items():
+        for stage in STAGES + ('total',):
+            values = np.array([r.get(stage, 0.0) for r in records])
+            rows.append({
+                'page': p,
+                'stage': stage,
+                'reruns': len(values),
+                'p50_ms': float(np.percentile(values, 50)),
+                'p95_ms': float(np.percentile(values, 95)),
+            })
+    return pd.DataFrame(rows, columns=['page', 'stage', 'reruns', 'p50_ms', 'p95_ms'])
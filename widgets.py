@@ -0,0 +1,134 @@
+"""
+Shared Streamlit input widgets.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import tracing
+from categories import compact
+from figure_cache import data_key
+
+
+PAGE_SIZES = [25, 50, 100, 250]
+_ORIGINAL_ORDER = '(original order)'
+_MAX_SORT_ORDERS = 64
+_sort_orders = OrderedDict()  # (data key, column, descending) -> row positions in sorted order
+_sort_lock = threading.Lock()
+
+
+def search_select(label, index, key, limit=50, extra_options=(), container=None, placeholder=None):
+    """
+    Search-as-you-type selector over a NameIndex: a text box narrows the choices to at most
+    `limit` matches (prefix, word, code or fuzzy) and a selectbox picks one of them, so only
+    the matches are sent to the browser instead of every name.
+    `extra_options` (e.g. "All") are always offered first. Returns the selected name or None.
+    """
+    container = container or st.sidebar
+    query = container.text_input("Search", key=f"{key}_query",
+                                 placeholder=placeholder or "Type part of a name or code")
+    options = list(extra_options) + [name for name in index.search(query, limit=limit)
+                                     if name not in extra_options]
+
+    # Keep the current choice selectable while the user searches for another one
+    current = st.session_state.get(key)
+    if current is not None and current not in options:
+        options.insert(len(extra_options), current)
+
+    if not options:
+        container.warning(f"No matches for '{query}'.")
+        return None
+
+    def describe(name):
+        code = index.code_for(name)
+        return f"{name} ({code})" if code else name
+
+    return container.selectbox(label, options, key=key, format_func=describe)
+
+
+def sort_order(df, column, descending=False, key=None):
+    """
+    Row positions of `df` sorted by `column` (NaN last), computed once per frame contents and
+    kept process-wide, so paging and re-sorting a large table is a slice of a cached array.
+    """
+    cache_key = (key or data_key(df), column, descending)
+    with _sort_lock:
+        order = _sort_orders.get(cache_key)
+        if order is not None:
+            _sort_orders.move_to_end(cache_key)
+            return order
+
+    values = df[column].reset_index(drop=True)
+    if isinstance(values.dtype, pd.CategoricalDtype) and not values.cat.ordered:
+        # Shared-dictionary labels (categories.py) sort by label, not by code
+        values = values.astype(object)
+    order = values.sort_values(ascending=not descending, kind='stable', na_position='last').index.to_numpy()
+    with _sort_lock:
+        _sort_orders[cache_key] = order
+        while len(_sort_orders) > _MAX_SORT_ORDERS:
+            _sort_orders.popitem(last=False)
+    return order
+
+
+def paginated_table(df, key, page_size=50, sort_by=None, descending=True, container=None):
+    """
+    Show one page of `df` with sort and page controls. Only the visible rows are
+    serialized and sent to the browser; the sort order is served from sort_order().
+    """
+    container = container or st
+    total = len(df)
+    if total == 0:
+        container.info("No rows to display.")
+        return
+
+    columns = [_ORIGINAL_ORDER] + [str(c) for c in df.columns]
+    default_sort = columns.index(str(sort_by)) if sort_by is not None and str(sort_by) in columns else 0
+    sort_col, order_col, size_col, page_col = container.columns([3, 2, 2, 2])
+    sort_label = sort_col.selectbox("Sort by", columns, index=default_sort, key=f"{key}_sort")
+    direction = order_col.selectbox("Order", ['Descending', 'Ascending'], index=0 if descending else 1,
+                                    key=f"{key}_order")
+    page_size = size_col.selectbox("Rows per page", PAGE_SIZES,
+                                   index=PAGE_SIZES.index(page_size) if page_size in PAGE_SIZES else 1,
+                                   key=f"{key}_size")
+
+    n_pages = max(1, math.ceil(total / page_size))
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages  # data shrank since the last rerun
+    page = page_col.number_input("Page", min_value=1, max_value=n_pages, step=1, key=page_key)
+
+    start = (int(page) - 1) * page_size
+    stop = min(start + page_size, total)
+    if sort_label == _ORIGINAL_ORDER:
+        rows = np.arange(start, stop)
+    else:
+        column = df.columns[columns.index(sort_label) - 1]
+        rows = sort_order(df, column, descending=direction == 'Descending')[start:stop]
+
+    # Only the visible rows are sent; drop the shared-dictionary labels they do not use
+    container.dataframe(compact(df.iloc[rows]), use_container_width=True)
+    container.caption(f"Rows {start + 1:,}–{stop:,} of {total:,} (page {int(page)} of {n_pages})")
+
+
+def latency_panel(page):
+    """
+    Finish this rerun's trace and show, in a collapsed sidebar expander, its time per stage
+    plus the page's p50/p95 per stage over the rolling window. Call at the end of the page.
+    """
+    spans = tracing.current_spans()
+    record = tracing.end_page()
+    if record is None:
+        return
+    with st.sidebar.expander("⏱ Page timings"):
+        st.caption(f"This rerun: {record['total']:,.0f} ms — " +
+                   ", ".join(f"{stage} {record[stage]:,.0f}" for stage in tracing.STAGES))
+        summary = tracing.latency_summary(page)
+        st.dataframe(summary[['stage', 'reruns', 'p50_ms', 'p95_ms']].round(1), hide_index=True,
+                     use_container_width=True)
+        if not spans.empty:
+            slowest = spans.groupby(['stage', 'name'], dropna=False)['ms'].sum().nlargest(5).round(1)
+            st.dataframe(slowest.reset_index(), hide_index=True, use_container_width=True)